@@ -0,0 +1,133 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.response import Response
+from recipes.models import Product, ProductInRecipe, Recipe, User
+
+from .conditional import is_not_modified
+
+GENERATION_CACHE_KEY = 'recipes:cache:generation'
+STATS_CACHE_KEY = 'recipes:cache:{}'
+RESPONSE_CACHE_KEY = 'recipes:response:{}:{}'
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+USER_PUBLIC_FIELDS = {
+    'username',
+    'email',
+    'first_name',
+    'last_name',
+    'avatar'
+}
+
+
+def get_generation():
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def bump_generation():
+    cache.set(GENERATION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def record(event):
+    key = STATS_CACHE_KEY.format(event)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_stats():
+    return {
+        event: cache.get(STATS_CACHE_KEY.format(event), 0)
+        for event in ('hits', 'misses')
+    }
+
+
+def get_cache_key(request, action, kwargs):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    raw_key = repr((
+        request.scheme,
+        request.get_host(),
+        action,
+        sorted(kwargs.items()),
+        params,
+        request.accepted_renderer.format
+    ))
+    return RESPONSE_CACHE_KEY.format(
+        get_generation(),
+        hashlib.md5(raw_key.encode()).hexdigest()
+    )
+
+
+def cache_anonymous_response(view_method):
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return view_method(view, request, *args, **kwargs)
+        key = get_cache_key(request, view.action, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            record('hits')
+            data, headers = cached
+            if 'ETag' in headers and is_not_modified(
+                request,
+                headers['ETag'],
+                None
+            ):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(data)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+        record('misses')
+        response = view_method(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, (response.data, {
+                header: response[header]
+                for header in VALIDATOR_HEADERS
+                if response.has_header(header)
+            }), settings.RECIPES_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=ProductInRecipe)
+@receiver(post_delete, sender=ProductInRecipe)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=User)
+def invalidate_recipes_cache(**kwargs):
+    transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipes_cache_on_user_change(
+    created=False,
+    update_fields=None,
+    **kwargs
+):
+    if created:
+        return
+    if update_fields and not USER_PUBLIC_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(bump_generation)
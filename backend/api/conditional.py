@@ -0,0 +1,75 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max, Subquery
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from recipes.models import Favorite, ShoppingCart, Subscription, User
+
+
+def relation_subqueries(model, user):
+    rows = model.objects.filter(user=user).order_by().values('user')
+    return (
+        Subquery(rows.annotate(count=Count('id')).values('count')),
+        Subquery(rows.annotate(max_id=Max('id')).values('max_id'))
+    )
+
+
+def get_viewer_version(user):
+    if user.is_anonymous:
+        return None
+    return User.objects.filter(pk=user.pk).values_list(
+        *relation_subqueries(Favorite, user),
+        *relation_subqueries(ShoppingCart, user),
+        *relation_subqueries(Subscription, user)
+    ).first()
+
+
+def make_etag(*parts):
+    return f'"{hashlib.md5(repr(parts).encode()).hexdigest()}"'
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in if_none_match or if_none_match.strip() == '*'
+    if last_modified is None:
+        return False
+    if_modified_since = parse_http_date_safe(
+        request.headers.get('If-Modified-Since', '')
+    )
+    return (if_modified_since is not None
+            and int(last_modified.timestamp()) <= if_modified_since)
+
+
+def conditional_response(version_method):
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            version = getattr(view, version_method)(*args, **kwargs)
+            if version is None:
+                return view_method(view, request, *args, **kwargs)
+            parts, last_modified = version
+            if request.user.is_authenticated:
+                last_modified = None
+            etag = make_etag(
+                view.action,
+                request.accepted_renderer.format,
+                get_viewer_version(request.user),
+                *parts
+            )
+            if is_not_modified(request, etag, last_modified):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(
+                    last_modified.timestamp()
+                )
+            return response
+        return wrapper
+    return decorator
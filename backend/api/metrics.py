@@ -0,0 +1,242 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db import connection
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+from .cache import get_stats as get_cache_stats
+from .permissions import HasMetricsToken
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304
+)
+HISTOGRAMS = (
+    (
+        'foodgram_request_duration_seconds',
+        'Total request handling time',
+        DURATION_BUCKETS
+    ),
+    (
+        'foodgram_request_db_duration_seconds',
+        'Time spent executing SQL per request',
+        DURATION_BUCKETS
+    ),
+    (
+        'foodgram_request_serialize_duration_seconds',
+        'Time spent serializing response data, excluding SQL',
+        DURATION_BUCKETS
+    ),
+    (
+        'foodgram_request_render_duration_seconds',
+        'Time spent rendering the response body',
+        DURATION_BUCKETS
+    ),
+    (
+        'foodgram_request_db_queries',
+        'SQL queries executed per request',
+        QUERY_BUCKETS
+    ),
+    (
+        'foodgram_response_size_bytes',
+        'Response body size',
+        SIZE_BUCKETS
+    ),
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            )
+        lines.append(f'{name}_sum{{{labels}}} {self.total}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.requests = {}
+
+    def observe(self, view, status_code, values):
+        with self.lock:
+            key = (view, f'{status_code // 100}xx')
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for (name, _, buckets), value in zip(HISTOGRAMS, values):
+                if value is None:
+                    continue
+                histogram = self.histograms.get((name, view))
+                if histogram is None:
+                    histogram = self.histograms[(name, view)] = Histogram(
+                        buckets
+                    )
+                histogram.observe(value)
+
+    def render(self):
+        lines = [
+            '# HELP foodgram_requests_total Handled requests',
+            '# TYPE foodgram_requests_total counter',
+        ]
+        with self.lock:
+            for (view, status_class), count in sorted(self.requests.items()):
+                lines.append(
+                    f'foodgram_requests_total{{view="{view}",'
+                    f'status="{status_class}"}} {count}'
+                )
+            for name, description, _ in HISTOGRAMS:
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for (histogram_name, view), histogram in sorted(
+                    self.histograms.items()
+                ):
+                    if histogram_name == name:
+                        lines.extend(
+                            histogram.render(name, f'view="{view}"')
+                        )
+        lines.append('# TYPE foodgram_recipes_cache_events_total counter')
+        for event, count in get_cache_stats().items():
+            lines.append(
+                f'foodgram_recipes_cache_events_total{{event="{event}"}} '
+                f'{count}'
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def get_view_name(request, view_func):
+    actions = getattr(view_func, 'actions', None)
+    initkwargs = getattr(view_func, 'initkwargs', {})
+    if actions and 'basename' in initkwargs:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f"{initkwargs['basename']}-{action}"
+    if request.resolver_match is not None:
+        return request.resolver_match.view_name
+    return 'unknown'
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class SerializationTimer:
+    def __init__(self, query_timer):
+        self.query_timer = query_timer
+        self.duration = 0.0
+        self.active = False
+
+
+serialization_timer = ContextVar('serialization_timer', default=None)
+
+
+class SerializationMetricsMixin:
+    def to_representation(self, instance):
+        timer = serialization_timer.get()
+        if timer is None or timer.active:
+            return super().to_representation(instance)
+        timer.active = True
+        queries_duration = timer.query_timer.duration
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timer.duration += time.perf_counter() - start - (
+                timer.query_timer.duration - queries_duration
+            )
+            timer.active = False
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics_view_name = 'unmatched'
+        request.metrics_render_start = None
+        timer = QueryTimer()
+        serialization = SerializationTimer(timer)
+        token = serialization_timer.set(serialization)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            serialization_timer.reset(token)
+        total = time.perf_counter() - start
+        render = None
+        if request.metrics_render_start is not None:
+            render = start + total - request.metrics_render_start
+        size = None
+        if not response.streaming:
+            size = len(response.content)
+        registry.observe(
+            request.metrics_view_name,
+            response.status_code,
+            (
+                total,
+                timer.duration,
+                serialization.duration,
+                render,
+                timer.count,
+                size
+            )
+        )
+        timings = [
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"',
+            f'serialize;dur={serialization.duration * 1000:.1f}'
+        ]
+        if render is not None:
+            timings.append(f'render;dur={render * 1000:.1f}')
+        timings.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view_name = get_view_name(request, view_func)
+
+    def process_template_response(self, request, response):
+        request.metrics_render_start = time.perf_counter()
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([HasMetricsToken | IsAdminUser])
+def metrics(request):
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,124 @@
+import json
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+IGNORED_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO')
+PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+STACK_DEPTH = 8
+INSTRUMENTATION_FILES = ('api/metrics.py', 'api/nplusone.py')
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def get_fingerprint(sql):
+    sql = PLACEHOLDER_LIST.sub('(%s...)', sql)
+    sql = STRING_LITERAL.sub('?', sql)
+    return NUMBER_LITERAL.sub('?', sql)
+
+
+def get_stack():
+    base_dir = str(settings.BASE_DIR)
+    frames = (
+        (frame.filename[len(base_dir) + 1:], frame)
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+    )
+    return [
+        f'{filename}:{frame.lineno} in {frame.name}'
+        for filename, frame in frames
+        if filename not in INSTRUMENTATION_FILES
+    ][-STACK_DEPTH:]
+
+
+class QueryRepeatDetector:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_STATEMENTS):
+            fingerprint = get_fingerprint(sql)
+            self.counts[fingerprint] += 1
+            if self.counts[fingerprint] == self.threshold + 1:
+                self.stacks[fingerprint] = get_stack()
+        return execute(sql, params, many, context)
+
+    def get_repeats(self):
+        return [
+            {
+                'query': fingerprint,
+                'count': self.counts[fingerprint],
+                'stack': stack,
+            }
+            for fingerprint, stack in self.stacks.items()
+        ]
+
+
+def format_repeats(repeats):
+    return '\n'.join(
+        f"{repeat['count']}x {repeat['query']}\n    "
+        + '\n    '.join(repeat['stack'])
+        for repeat in repeats
+    )
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None):
+    detector = QueryRepeatDetector(
+        threshold if threshold is not None else settings.NPLUSONE_THRESHOLD
+    )
+    with connection.execute_wrapper(detector):
+        yield detector
+    repeats = detector.get_repeats()
+    if repeats:
+        raise NPlusOneError(
+            'Repeated queries:\n' + format_repeats(repeats)
+        )
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        if settings.NPLUSONE_MODE not in ('raise', 'warn'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        detector = QueryRepeatDetector(settings.NPLUSONE_THRESHOLD)
+        with connection.execute_wrapper(detector):
+            response = self.get_response(request)
+        repeats = detector.get_repeats()
+        if not repeats:
+            return response
+        view = getattr(request, 'metrics_view_name', request.path)
+        if settings.NPLUSONE_MODE == 'raise':
+            raise NPlusOneError(
+                f'Repeated queries in {request.method} {view}:\n'
+                + format_repeats(repeats)
+            )
+        for repeat in repeats:
+            logger.warning(
+                'N+1 query detected: %s',
+                json.dumps({
+                    'method': request.method,
+                    'path': request.path,
+                    'view': view,
+                    **repeat
+                }, ensure_ascii=False),
+                extra={'nplusone': repeat, 'view': view}
+            )
+        return response
@@ -0,0 +1,95 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Product
+
+MAX_CHAR = chr(0x10FFFF)
+
+
+class ProductPrefixIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = (None, [], [], {})
+        self.checked_at = None
+
+    def get_version(self):
+        version = Product.objects.aggregate(
+            count=Count('id'),
+            updated_at=Max('updated_at')
+        )
+        updated_at = version['updated_at']
+        return '{}-{}'.format(
+            version['count'],
+            int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+        )
+
+    def invalidate(self):
+        self.checked_at = None
+
+    def build(self, version):
+        products = sorted(
+            (
+                {
+                    'id': product_id,
+                    'name': name,
+                    'measurement_unit': measurement_unit
+                }
+                for product_id, name, measurement_unit
+                in Product.objects.values_list(
+                    'id',
+                    'name',
+                    'measurement_unit'
+                ).iterator()
+            ),
+            key=lambda product: (product['name'].casefold(), product['id'])
+        )
+        return (
+            version,
+            [product['name'].casefold() for product in products],
+            products,
+            {product['id']: product for product in products}
+        )
+
+    def get_state(self):
+        now = time.monotonic()
+        if self.checked_at is not None and (
+            now - self.checked_at < settings.PRODUCT_INDEX_CHECK_INTERVAL
+        ):
+            return self.state
+        version = self.get_version()
+        self.checked_at = now
+        if self.state[0] != version:
+            with self.lock:
+                if self.state[0] != version:
+                    self.state = self.build(version)
+        return self.state
+
+    def search(self, prefix='', limit=None):
+        _, keys, products, _ = self.get_state()
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + MAX_CHAR, lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return products[start:end]
+
+    def get(self, product_id):
+        return self.get_state()[3].get(product_id)
+
+    @property
+    def version(self):
+        return self.get_state()[0]
+
+
+product_index = ProductPrefixIndex()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_index(**kwargs):
+    product_index.invalidate()
@@ -1,7 +1,10 @@
+import json
+
+from django.http import QueryDict
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.core.validators import RegexValidator
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from djoser.serializers import (
     UserCreateSerializer as DjoserUserCreateSerializer,
     UserSerializer as DjoserUserSerializer,
@@ -15,8 +18,65 @@ from recipes.models import (
     Recipe,
     ProductInRecipe,
     Favorite,
-    ShoppingCart
+    ShoppingCart,
+    ShoppingCartItem
 )
+from recipes.renditions import RENDITION_SIZES, get_rendition_url
+from .metrics import SerializationMetricsMixin
+from .uploads import UploadCleanupMixin, UploadImageField
+
+RECIPES_LIMIT_DEFAULT = 6
+RECIPES_LIMIT_MAX = 100
+BULK_IDS_MAX = 100
+
+
+def get_subscribed_author_ids(request):
+    if not request or request.user.is_anonymous:
+        return set()
+    if not hasattr(request, 'subscribed_author_ids'):
+        request.subscribed_author_ids = set(
+            Subscription.objects.filter(
+                user=request.user
+            ).values_list('author_id', flat=True)
+        )
+    return request.subscribed_author_ids
+
+
+def build_rendition_url(request, image, size):
+    url = get_rendition_url(image, size)
+    return request.build_absolute_uri(url) if url else ''
+
+
+class ImageRenditionsMixin:
+    rendition_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if not request or not request.GET.get('renditions'):
+            for field_name in self.rendition_fields:
+                fields.pop(field_name, None)
+        return fields
+
+
+class RecipeImageRenditionsMixin(ImageRenditionsMixin):
+    rendition_fields = ('image_small', 'srcset')
+
+    def get_image_small(self, recipe):
+        return build_rendition_url(
+            self.context.get('request'),
+            recipe.image,
+            RENDITION_SIZES[0]
+        )
+
+    def get_srcset(self, recipe):
+        request = self.context.get('request')
+        if not recipe.image:
+            return ''
+        return ', '.join(
+            f'{build_rendition_url(request, recipe.image, size)} {size}w'
+            for size in RENDITION_SIZES
+        )
 
 
 class UserCreateSerializer(DjoserUserCreateSerializer):
@@ -66,13 +126,19 @@ class UserCreateSerializer(DjoserUserCreateSerializer):
         }
 
 
-class UserSerializer(DjoserUserSerializer):
+class UserSerializer(
+    SerializationMetricsMixin,
+    ImageRenditionsMixin,
+    DjoserUserSerializer
+):
     avatar = serializers.ImageField(
         read_only=True,
         allow_null=True,
         use_url=True
     )
+    avatar_small = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
+    rendition_fields = ('avatar_small',)
 
     class Meta:
         model = User
@@ -83,50 +149,70 @@ class UserSerializer(DjoserUserSerializer):
             'first_name',
             'last_name',
             'avatar',
+            'avatar_small',
             'is_subscribed'
         ]
         read_only_fields = fields
 
+    def get_avatar_small(self, user):
+        return build_rendition_url(
+            self.context.get('request'),
+            user.avatar,
+            RENDITION_SIZES[0]
+        )
+
     def get_is_subscribed(self, user):
-        request = self.context.get('request')
-        return (request
-                and request.user.is_authenticated
-                and Subscription.objects.filter(
-                    user=request.user,
-                    author=user
-                ).exists())
+        return user.id in get_subscribed_author_ids(
+            self.context.get('request')
+        )
+
+
+def get_recipes_limit(request):
+    try:
+        limit = int(request.GET.get('recipes_limit', RECIPES_LIMIT_DEFAULT))
+    except (AttributeError, ValueError):
+        return RECIPES_LIMIT_DEFAULT
+    return min(max(limit, 0), RECIPES_LIMIT_MAX)
 
 
 class UserWithRecipesSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source='recipes.count',
-        read_only=True
-    )
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ['recipes', 'recipes_count']
 
     def get_recipes(self, user):
-        request = self.context.get('request')
-        limit = int(request.GET.get('recipes_limit', 10**10))
-        queryset = user.recipes.all()[:limit]
+        if hasattr(user, 'limited_recipes'):
+            recipes = user.limited_recipes
+        else:
+            recipes = user.recipes.all()[
+                :get_recipes_limit(self.context.get('request'))
+            ]
         return RecipeMinifiedSerializer(
-            queryset,
+            recipes,
             many=True,
             context=self.context
         ).data
 
+    def get_recipes_count(self, user):
+        if hasattr(user, 'recipes_count'):
+            return user.recipes_count
+        return user.recipes.count()
 
-class SetAvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField()
+
+class SetAvatarSerializer(UploadCleanupMixin, serializers.ModelSerializer):
+    avatar = UploadImageField()
 
     class Meta:
         model = User
         fields = ('avatar',)
 
 
-class SetAvatarResponseSerializer(serializers.ModelSerializer):
+class SetAvatarResponseSerializer(
+    SerializationMetricsMixin,
+    serializers.ModelSerializer
+):
     avatar = serializers.ImageField(
         read_only=True,
         use_url=True
@@ -150,14 +236,48 @@ class SetPasswordSerializer(DjoserSetPasswordSerializer):
         return value
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(
+    SerializationMetricsMixin,
+    serializers.ModelSerializer
+):
     class Meta:
         model = Product
         fields = ('id', 'name', 'measurement_unit')
 
 
+class ProductIdField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class IngredientInRecipeListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        products = Product.objects.in_bulk({item['id'] for item in value})
+        errors = [
+            {} if item['id'] in products else {
+                'id': [
+                    ProductIdField.default_error_messages[
+                        'does_not_exist'
+                    ].format(pk_value=item['id'])
+                ]
+            }
+            for item in value
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for item in value:
+            item['id'] = products[item['id']]
+        return value
+
+
 class IngredientInRecipeCreateSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = ProductIdField(
         queryset=Product.objects.all(),
         required=True
     )
@@ -166,8 +286,14 @@ class IngredientInRecipeCreateSerializer(serializers.Serializer):
         required=True
     )
 
+    class Meta:
+        list_serializer_class = IngredientInRecipeListSerializer
+
 
-class IngredientInRecipeSerializer(serializers.ModelSerializer):
+class IngredientInRecipeSerializer(
+    SerializationMetricsMixin,
+    serializers.ModelSerializer
+):
     id = serializers.IntegerField(
         source='ingredient.id',
         read_only=True
@@ -190,12 +316,41 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class RecipeMinifiedSerializer(serializers.ModelSerializer):
+class ShoppingCartItemSerializer(IngredientInRecipeSerializer):
+    class Meta(IngredientInRecipeSerializer.Meta):
+        model = ShoppingCartItem
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_IDS_MAX
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class RecipeMinifiedSerializer(
+    SerializationMetricsMixin,
+    RecipeImageRenditionsMixin,
+    serializers.ModelSerializer
+):
     image = serializers.SerializerMethodField(read_only=True)
+    image_small = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id',
+            'name',
+            'image',
+            'image_small',
+            'srcset',
+            'cooking_time'
+        )
         read_only_fields = fields
 
     def get_image(self, obj):
@@ -203,7 +358,11 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(obj.image.url) if obj.image else ''
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(
+    SerializationMetricsMixin,
+    RecipeImageRenditionsMixin,
+    serializers.ModelSerializer
+):
     author = UserSerializer(read_only=True)
     ingredients = IngredientInRecipeSerializer(
         many=True,
@@ -213,6 +372,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField(read_only=True)
+    image_small = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -224,12 +385,16 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_small',
+            'srcset',
             'text',
             'cooking_time'
         )
         read_only_fields = fields
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         request = self.context.get('request')
         return (request
                 and request.user.is_authenticated
@@ -239,6 +404,8 @@ class RecipeSerializer(serializers.ModelSerializer):
                 ).exists())
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         request = self.context.get('request')
         return (request
                 and request.user.is_authenticated
@@ -252,13 +419,16 @@ class RecipeSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(obj.image.url) if obj.image else ''
 
 
-class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
+class RecipeCreateUpdateSerializer(
+    UploadCleanupMixin,
+    serializers.ModelSerializer
+):
     ingredients = IngredientInRecipeCreateSerializer(
         many=True,
         write_only=True,
         required=True
     )
-    image = Base64ImageField(
+    image = UploadImageField(
         required=True,
         allow_null=False
     )
@@ -276,6 +446,20 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'ingredients', 'image', 'name', 'text', 'cooking_time')
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = data.dict()
+            if isinstance(data.get('ingredients'), str):
+                try:
+                    data['ingredients'] = json.loads(data['ingredients'])
+                except ValueError:
+                    raise serializers.ValidationError({
+                        'ingredients': [
+                            'Ожидается JSON-список ингредиентов.'
+                        ]
+                    })
+        return super().to_internal_value(data)
+
     def validate(self, data):
         if self.partial:
             missing_fields = []
@@ -305,11 +489,6 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Ингредиенты не должны повторяться."
             )
-        for item in value:
-            if not Product.objects.filter(id=item['id'].id).exists():
-                raise serializers.ValidationError(
-                    f"Ингредиент с id={item['id'].id} не существует."
-                )
         return value
 
     def validate_image(self, value):
@@ -329,17 +508,45 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             for item in ingredients_data
         ])
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         recipe = super().create(validated_data)
         self.create_ingredients(ingredients_data, recipe)
         return recipe
 
+    def update_ingredients(self, ingredients_data, recipe):
+        current = {
+            line.ingredient_id: line
+            for line in recipe.products.all()
+        }
+        new_lines = []
+        changed_lines = []
+        for item in ingredients_data:
+            line = current.pop(item['id'].id, None)
+            if line is None:
+                new_lines.append(ProductInRecipe(
+                    recipe=recipe,
+                    ingredient=item['id'],
+                    amount=item['amount']
+                ))
+            elif line.amount != item['amount']:
+                line.amount = item['amount']
+                changed_lines.append(line)
+        if current:
+            ProductInRecipe.objects.filter(
+                id__in=[line.id for line in current.values()]
+            ).delete()
+        if changed_lines:
+            ProductInRecipe.objects.bulk_update(changed_lines, ['amount'])
+        if new_lines:
+            ProductInRecipe.objects.bulk_create(new_lines)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
         if ingredients_data is not None:
-            instance.products.all().delete()
-            self.create_ingredients(ingredients_data, instance)
+            self.update_ingredients(ingredients_data, instance)
         return super().update(instance, validated_data)
 
 
@@ -0,0 +1,127 @@
+import csv
+import os
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.negotiation import DefaultContentNegotiation
+
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FONT_SIZE = 11
+PDF_LINE_HEIGHT = 16
+PDF_MARGIN = 50
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def get_title():
+    current_date = datetime.now().strftime('%Y-%m-%d %H:%M')
+    return f"Список покупок от {current_date}"
+
+
+def format_product(idx, item):
+    return (
+        f"{idx}. {item['name'].capitalize()} - "
+        f"{item['amount']} "
+        f"{item['measurement_unit']}"
+    )
+
+
+def format_recipe(idx, recipe):
+    return f"{idx}. {recipe['name']} (автор: {recipe['author__username']})"
+
+
+def iter_lines(products, recipes):
+    yield f"{get_title()} "
+    yield ""
+    idx = 0
+    for idx, item in enumerate(products, 1):
+        if idx == 1:
+            yield "Продукты:"
+        yield format_product(idx, item)
+    if not idx:
+        yield "Ваш список покупок пуст."
+        return
+    yield ""
+    yield "Рецепты в списке:"
+    for idx, recipe in enumerate(recipes, 1):
+        yield format_recipe(idx, recipe)
+
+
+def export_txt(products, recipes):
+    for line in iter_lines(products, recipes):
+        yield f"{line}\n"
+
+
+def export_csv(products, recipes):
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        ['№', 'Продукт', 'Количество', 'Единица измерения']
+    )
+    for idx, item in enumerate(products, 1):
+        yield writer.writerow([
+            idx,
+            item['name'].capitalize(),
+            item['amount'],
+            item['measurement_unit']
+        ])
+
+
+def get_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        raise ImproperlyConfigured(
+            'SHOPPING_LIST_PDF_FONT must point to a TTF font with Cyrillic '
+            f'glyphs, {settings.SHOPPING_LIST_PDF_FONT} does not exist'
+        )
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+    )
+    return PDF_FONT_NAME
+
+
+def export_pdf(products, recipes, chunk_size=64 * 1024):
+    return iter_pdf_chunks(get_pdf_font(), products, recipes, chunk_size)
+
+
+def iter_pdf_chunks(font, products, recipes, chunk_size):
+    buffer = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    with buffer:
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        _, height = A4
+        y = height - PDF_MARGIN
+        pdf.setFont(font, PDF_FONT_SIZE)
+        for line in iter_lines(products, recipes):
+            if y < PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(font, PDF_FONT_SIZE)
+                y = height - PDF_MARGIN
+            pdf.drawString(PDF_MARGIN, y, line)
+            y -= PDF_LINE_HEIGHT
+        pdf.save()
+        buffer.seek(0)
+        while chunk := buffer.read(chunk_size):
+            yield chunk
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': (export_txt, 'text/plain; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'pdf': (export_pdf, 'application/pdf'),
+}
@@ -0,0 +1,80 @@
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.http import Http404, HttpResponseRedirect
+from recipes.models import Recipe, ShortLink
+
+LEGACY_CODE = re.compile(r'^(\d+)-')
+CACHE_SIZE = 10000
+VERSION_CACHE_KEY = 'short_links:version'
+
+
+class RecipeLinkCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.links = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get_version(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def invalidate(self):
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+    def get(self, code):
+        version = self.get_version()
+        with self.lock:
+            if self.version != version:
+                self.links.clear()
+                self.version = version
+            recipe_id = self.links.get(code)
+            if recipe_id is not None:
+                self.links.move_to_end(code)
+            return recipe_id
+
+    def set(self, code, recipe_id):
+        with self.lock:
+            self.links[code] = recipe_id
+            self.links.move_to_end(code)
+            while len(self.links) > self.maxsize:
+                self.links.popitem(last=False)
+
+
+recipe_links = RecipeLinkCache(CACHE_SIZE)
+
+
+def resolve_code(code):
+    recipe_id = ShortLink.objects.filter(
+        code=code
+    ).values_list('recipe_id', flat=True).first()
+    if recipe_id is not None:
+        return recipe_id
+    match = LEGACY_CODE.match(code)
+    if match and Recipe.objects.filter(id=match.group(1)).exists():
+        return int(match.group(1))
+    return None
+
+
+def short_link_redirect(request, short_code):
+    recipe_id = recipe_links.get(short_code)
+    if recipe_id is None:
+        recipe_id = resolve_code(short_code)
+        if recipe_id is None:
+            raise Http404('Короткая ссылка не найдена.')
+        recipe_links.set(short_code, recipe_id)
+    return HttpResponseRedirect(f'/recipes/{recipe_id}')
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_links(**kwargs):
+    recipe_links.invalidate()
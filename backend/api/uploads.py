@@ -0,0 +1,168 @@
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+
+UPLOAD_TOKEN_PREFIX = 'upload:'
+UPLOADS_CONTEXT_KEY = 'uploads'
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def get_upload_dir(user):
+    return Path(settings.CHUNKED_UPLOAD_DIR) / str(user.pk)
+
+
+def get_upload_path(user, upload_id):
+    try:
+        upload_id = uuid.UUID(str(upload_id)).hex
+    except ValueError:
+        raise NotFound('Загрузка не найдена.')
+    path = get_upload_dir(user) / f'{upload_id}.part'
+    if not path.exists():
+        raise NotFound('Загрузка не найдена.')
+    return path
+
+
+def remove_expired_uploads(user):
+    upload_dir = get_upload_dir(user)
+    if not upload_dir.exists():
+        return
+    expired_before = time.time() - settings.CHUNKED_UPLOAD_EXPIRY
+    for path in upload_dir.glob('*.part'):
+        if path.stat().st_mtime < expired_before:
+            path.unlink(missing_ok=True)
+
+
+def create_upload(user):
+    remove_expired_uploads(user)
+    upload_dir = get_upload_dir(user)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    (upload_dir / f'{upload_id}.part').touch()
+    return upload_id
+
+
+def append_chunk(path, offset, stream, length):
+    if offset != path.stat().st_size:
+        raise serializers.ValidationError(
+            {'offset': 'Смещение не совпадает с размером загрузки.'}
+        )
+    if offset + length > settings.MAX_IMAGE_UPLOAD_SIZE:
+        raise serializers.ValidationError(
+            {'offset': 'Превышен максимальный размер изображения.'}
+        )
+    with open(path, 'ab') as file:
+        remaining = length
+        while remaining:
+            block = stream.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            file.write(block)
+            remaining -= len(block)
+    return path.stat().st_size
+
+
+def get_image_format(file):
+    try:
+        return Image.open(file).format or ''
+    except (OSError, Image.DecompressionBombError):
+        return ''
+    finally:
+        file.seek(0)
+
+
+def open_upload(user, upload_id):
+    try:
+        path = get_upload_path(user, upload_id)
+    except NotFound as error:
+        raise serializers.ValidationError(error.detail)
+    file = File(open(path, 'rb'), name=path.name)
+    try:
+        image_format = get_image_format(file)
+    except Exception:
+        file.close()
+        raise
+    file.name = f'{path.stem}.{image_format.lower() or "img"}'
+    file.upload_path = path
+    return file
+
+
+def remove_upload(file):
+    file.close()
+    file.upload_path.unlink(missing_ok=True)
+
+
+def size_error():
+    return serializers.ValidationError(
+        'Размер изображения не должен превышать '
+        f'{settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} МБ.'
+    )
+
+
+def check_image_file(file):
+    if file.size > settings.MAX_IMAGE_UPLOAD_SIZE:
+        raise size_error()
+    try:
+        width, height = Image.open(file).size
+    except Image.DecompressionBombError:
+        width = height = settings.MAX_IMAGE_PIXELS
+    except OSError:
+        return
+    finally:
+        file.seek(0)
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        raise serializers.ValidationError(
+            'Разрешение изображения не должно превышать '
+            f'{settings.MAX_IMAGE_PIXELS} пикселей.'
+        )
+
+
+class CheckedImageField(serializers.ImageField):
+    def to_internal_value(self, data):
+        if isinstance(data, File):
+            check_image_file(data)
+        return super().to_internal_value(data)
+
+
+class UploadImageField(Base64ImageField, CheckedImageField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith(UPLOAD_TOKEN_PREFIX):
+            file = open_upload(
+                self.context['request'].user,
+                data[len(UPLOAD_TOKEN_PREFIX):]
+            )
+            try:
+                value = CheckedImageField.to_internal_value(self, file)
+            except Exception:
+                file.close()
+                raise
+            self.context.setdefault(UPLOADS_CONTEXT_KEY, []).append(file)
+            return value
+        if not isinstance(data, str):
+            return CheckedImageField.to_internal_value(self, data)
+        encoded = data.split(';base64,')[-1]
+        if len(encoded) * 3 // 4 > settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise size_error()
+        return super().to_internal_value(data)
+
+
+class UploadCleanupMixin:
+    def save(self, **kwargs):
+        instance = super().save(**kwargs)
+        for file in self.context.pop(UPLOADS_CONTEXT_KEY, []):
+            transaction.on_commit(lambda file=file: remove_upload(file))
+        return instance
+
+
+def get_stream_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
@@ -2,7 +2,13 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, RecipeViewSet, UserViewSet
+from .metrics import metrics
+from .views import (
+    ChunkedUploadViewSet,
+    ProductViewSet,
+    RecipeViewSet,
+    UserViewSet
+)
 
 router = DefaultRouter()
 router.register(
@@ -20,8 +26,14 @@ router.register(
     UserViewSet,
     basename='users'
 )
+router.register(
+    r'uploads',
+    ChunkedUploadViewSet,
+    basename='uploads'
+)
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/', metrics, name='metrics'),
     path('', include(router.urls)),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
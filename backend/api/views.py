@@ -1,12 +1,30 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import (
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated
+)
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.exceptions import (
+    NotFound,
+    PermissionDenied,
+    ValidationError
+)
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
-from django.http import FileResponse
-from django.urls import reverse
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    Max,
+    OuterRef,
+    Prefetch,
+    prefetch_related_objects
+)
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from recipes.models import (
     User,
     Subscription,
@@ -14,7 +32,9 @@ from recipes.models import (
     Recipe,
     ProductInRecipe,
     Favorite,
-    ShoppingCart
+    ShoppingCart,
+    ShoppingCartItem,
+    ShortLink
 )
 from .serializers import (
     UserSerializer,
@@ -25,23 +45,48 @@ from .serializers import (
     ProductSerializer,
     RecipeSerializer,
     RecipeCreateUpdateSerializer,
-    RecipeMinifiedSerializer
+    RecipeMinifiedSerializer,
+    RecipeIdsSerializer,
+    ShoppingCartItemSerializer,
+    get_recipes_limit
+)
+from .conditional import conditional_response
+from .cache import (
+    cache_anonymous_response,
+    get_generation,
+    get_stats as get_cache_stats
 )
 from .permissions import IsAuthorOrReadOnly
+from .product_index import product_index
+from .uploads import (
+    UPLOAD_TOKEN_PREFIX,
+    append_chunk,
+    create_upload,
+    get_stream_length,
+    get_upload_path
+)
+from .shopping_list import SHOPPING_LIST_FORMATS, ShoppingListNegotiation
 from .pagination import StandardResultsSetPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import ProductFilter, RecipeFilter
 from djoser.views import UserViewSet as DjoserUserViewSet
-from datetime import datetime
-from io import StringIO
-import uuid
-import re
+
+STREAM_CHUNK_SIZE = 2000
+INGREDIENTS_CACHE_MAX_AGE = 300
+
+
+def ingredients_prefetch():
+    return Prefetch(
+        'products',
+        queryset=ProductInRecipe.objects.select_related('ingredient')
+    )
 
 
 class UserViewSet(DjoserUserViewSet):
     queryset = User.objects.all().order_by('id')
     serializer_class = UserSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('username', 'id')
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['username', 'email']
 
@@ -54,22 +99,57 @@ class UserViewSet(DjoserUserViewSet):
             else super().get_permissions()
         )
 
+    def get_list_version(self, *args, **kwargs):
+        version = self.filter_queryset(self.get_queryset()).aggregate(
+            count=Count('id'),
+            users=Max('updated_at')
+        )
+        return tuple(version.values()), None
+
+    def get_detail_version(self, *args, **kwargs):
+        if self.lookup_field not in kwargs:
+            return None
+        try:
+            updated_at = User.objects.filter(
+                pk=kwargs[self.lookup_field]
+            ).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            return None
+        if updated_at is None:
+            return None
+        return (updated_at,), updated_at
+
+    def get_subscriptions_version(self, *args, **kwargs):
+        version = User.objects.filter(
+            authors__user=self.request.user
+        ).aggregate(
+            count=Count('id', distinct=True),
+            authors=Max('updated_at'),
+            recipes_count=Count('recipes'),
+            recipes=Max('recipes__updated_at')
+        )
+        return tuple(version.values()), None
+
+    @conditional_response('get_list_version')
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         serializer = UserSerializer(
-            page or queryset,
+            page if page is not None else queryset,
             many=True,
             context={'request': request}
         )
         data = serializer.data
-        return self.get_paginated_response(data) if page else Response({
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response({
             'count': queryset.count(),
             'next': None,
             'previous': None,
             'results': data
         })
 
+    @conditional_response('get_detail_version')
     def retrieve(self, request, *args, **kwargs):
         return Response(
             self.get_serializer(
@@ -97,16 +177,29 @@ class UserViewSet(DjoserUserViewSet):
         permission_classes=[IsAuthenticated],
         serializer_class=UserWithRecipesSerializer
     )
+    @conditional_response('get_subscriptions_version')
     def subscriptions(self, request):
-        queryset = User.objects.filter(authors__user=request.user)
+        queryset = User.objects.filter(
+            authors__user=request.user
+        ).annotate(
+            recipes_count=Count('recipes')
+        ).order_by('username').prefetch_related(
+            Prefetch(
+                'recipes',
+                queryset=Recipe.objects.all()[:get_recipes_limit(request)],
+                to_attr='limited_recipes'
+            )
+        )
         page = self.paginate_queryset(queryset)
         serializer = UserWithRecipesSerializer(
-            page or queryset,
+            page if page is not None else queryset,
             many=True,
             context={'request': request}
         )
         data = serializer.data
-        return self.get_paginated_response(data) if page else Response({
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response({
             'count': queryset.count(),
             'next': None,
             'previous': None,
@@ -125,11 +218,10 @@ class UserViewSet(DjoserUserViewSet):
         if request.method == 'POST':
             if user == author:
                 raise ValidationError("Нельзя подписаться на самого себя.")
-            if Subscription.objects.filter(user=user, author=author).exists():
+            if not Subscription.objects.add(user.id, [author.id]):
                 raise ValidationError(
                     f"Вы уже подписаны на пользователя {author.username}."
                 )
-            Subscription.objects.create(user=user, author=author)
             return Response(
                 UserWithRecipesSerializer(
                     author,
@@ -137,12 +229,11 @@ class UserViewSet(DjoserUserViewSet):
                 ).data,
                 status=status.HTTP_201_CREATED
             )
-        if not Subscription.objects.filter(user=user, author=author).exists():
+        if not Subscription.objects.remove(user.id, [author.id]):
             raise ValidationError(
                 "Вы не подписаны на этого пользователя.",
                 code=400
             )
-        Subscription.objects.filter(user=user, author=author).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -156,7 +247,8 @@ class UserViewSet(DjoserUserViewSet):
         if request.method == 'PUT':
             serializer = SetAvatarSerializer(
                 data=request.data,
-                instance=user
+                instance=user,
+                context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
@@ -170,6 +262,54 @@ class UserViewSet(DjoserUserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ChunkedUploadViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def get_upload_data(self, upload_id, path):
+        return {
+            'id': upload_id,
+            'offset': path.stat().st_size,
+            'token': f'{UPLOAD_TOKEN_PREFIX}{upload_id}'
+        }
+
+    def create(self, request):
+        upload_id = create_upload(request.user)
+        return Response(
+            self.get_upload_data(
+                upload_id,
+                get_upload_path(request.user, upload_id)
+            ),
+            status=status.HTTP_201_CREATED
+        )
+
+    def retrieve(self, request, pk=None):
+        return Response(
+            self.get_upload_data(pk, get_upload_path(request.user, pk))
+        )
+
+    def partial_update(self, request, pk=None):
+        path = get_upload_path(request.user, pk)
+        length = get_stream_length(request)
+        if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            raise ValidationError(
+                'Размер части не должен превышать '
+                f'{settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} байт.'
+            )
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            raise ValidationError(
+                {'offset': 'Заголовок Upload-Offset обязателен.'}
+            )
+        if length:
+            append_chunk(path, offset, request.stream, length)
+        return Response(self.get_upload_data(pk, path))
+
+    def destroy(self, request, pk=None):
+        get_upload_path(request.user, pk).unlink(missing_ok=True)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
@@ -178,12 +318,52 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = ProductFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = -1
+            if limit < 0:
+                raise ValidationError(
+                    {'limit': 'Ожидается неотрицательное целое число.'}
+                )
+        return self.get_index_response(
+            product_index.search(request.query_params.get('name', ''), limit)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            product = product_index.get(int(kwargs[self.lookup_field]))
+        except ValueError:
+            product = None
+        if product is None:
+            raise NotFound('Ингредиент не найден.')
+        return self.get_index_response(product)
+
+    def get_index_response(self, data):
+        renderer_format = self.request.accepted_renderer.format
+        etag = f'"{product_index.version}-{renderer_format}"'
+        if etag in self.request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=INGREDIENTS_CACHE_MAX_AGE
+        )
+        return response
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all().select_related(
-        'author').prefetch_related('products')
+        'author').prefetch_related(ingredients_prefetch())
     permission_classes = [IsAuthorOrReadOnly]
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('-created_at', '-id')
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
@@ -192,27 +372,74 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return [DjangoFilterBackend]
         return []
 
+    def get_queryset(self):
+        recipes = super().get_queryset()
+        user = self.request.user
+        if self.action not in ['list', 'retrieve'] or user.is_anonymous:
+            return recipes
+        return recipes.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user,
+                recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user,
+                recipe=OuterRef('pk')
+            ))
+        )
+
     def get_serializer_class(self):
         return RecipeCreateUpdateSerializer if self.action in [
             'create', 'update', 'partial_update'
         ] else RecipeSerializer
 
+    def get_list_version(self, *args, **kwargs):
+        return (
+            get_generation(),
+            sorted(self.request.query_params.lists())
+        ), None
+
+    def get_detail_version(self, *args, **kwargs):
+        if self.lookup_field not in kwargs:
+            return None
+        try:
+            version = Recipe.objects.filter(
+                pk=kwargs[self.lookup_field]
+            ).aggregate(
+                recipe=Max('updated_at'),
+                author=Max('author__updated_at'),
+                products=Max('products__ingredient__updated_at')
+            )
+        except (TypeError, ValueError):
+            return None
+        if version['recipe'] is None:
+            return None
+        return tuple(version.values()), max(
+            value for value in version.values() if value is not None
+        )
+
+    @cache_anonymous_response
+    @conditional_response('get_list_version')
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         serializer = RecipeSerializer(
-            page or queryset,
+            page if page is not None else queryset,
             many=True,
             context={'request': request}
         )
         data = serializer.data
-        return self.get_paginated_response(data) if page else Response({
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response({
             'count': queryset.count(),
             'next': None,
             'previous': None,
             'results': data
         })
 
+    @cache_anonymous_response
+    @conditional_response('get_detail_version')
     def retrieve(self, request, *args, **kwargs):
         return Response(
             RecipeSerializer(
@@ -229,14 +456,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         return Response(
-            RecipeSerializer(
-                serializer.instance,
-                context={'request': request}
-            ).data,
+            self.get_recipe_data(serializer.instance),
             status=status.HTTP_201_CREATED,
             headers=self.get_success_headers(serializer.data)
         )
 
+    def get_recipe_data(self, recipe):
+        recipe._prefetched_objects_cache = {}
+        prefetch_related_objects([recipe], ingredients_prefetch())
+        return RecipeSerializer(
+            recipe,
+            context={'request': self.request}
+        ).data
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -252,12 +484,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        return Response(
-            RecipeSerializer(
-                instance,
-                context={'request': request}
-            ).data
-        )
+        return Response(self.get_recipe_data(instance))
 
     def perform_update(self, serializer):
         serializer.save()
@@ -268,14 +495,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         instance.delete()
 
     @staticmethod
+    @transaction.atomic
     def toggle_relation(model, user, recipe, request, relation_name):
         if request.method == 'POST':
-            if model.objects.filter(user=user, recipe=recipe).exists():
+            if not model.objects.add(user.id, [recipe.id]):
                 raise ValidationError(
                     f"Рецепт '{recipe.name}' уже в {relation_name}.",
                     code=400
                 )
-            model.objects.create(user=user, recipe=recipe)
             return Response(
                 RecipeMinifiedSerializer(
                     recipe,
@@ -283,12 +510,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 ).data,
                 status=status.HTTP_201_CREATED
             )
-        if not model.objects.filter(user=user, recipe=recipe).exists():
+        if not model.objects.remove(user.id, [recipe.id]):
             raise ValidationError(
                 f"Рецепт '{recipe.name}' не находится в {relation_name}.",
                 code=400
             )
-        model.objects.filter(user=user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -319,6 +545,64 @@ class RecipeViewSet(viewsets.ModelViewSet):
             "списке покупок"
         )
 
+    @staticmethod
+    @transaction.atomic
+    def bulk_relation(model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user = request.user
+        if request.method == 'POST':
+            changed = model.objects.add(user.id, ids)
+            existing = changed | set(
+                Recipe.objects.filter(
+                    id__in=set(ids) - changed
+                ).values_list('id', flat=True)
+            )
+            outcomes = {True: 'added', False: 'exists'}
+        else:
+            changed = model.objects.remove(user.id, ids)
+            existing = changed
+            outcomes = {True: 'removed', False: 'not_found'}
+        return Response({
+            'results': [
+                {
+                    'id': recipe_id,
+                    'status': outcomes[recipe_id in changed]
+                    if recipe_id in existing else 'not_found'
+                }
+                for recipe_id in ids
+            ]
+        })
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite/bulk'
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_relation(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/bulk'
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_relation(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        methods=['delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/clear'
+    )
+    def clear_shopping_cart(self, request):
+        ShoppingCart.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(
         detail=True,
         methods=['get'],
@@ -326,80 +610,70 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='get-link'
     )
     def get_link(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        short_code = f"{recipe.id}-{str(uuid.uuid4())[:8]}"
+        code = ShortLink.objects.get_code(get_object_or_404(Recipe, pk=pk))
         base_url = request.build_absolute_uri('/')[:-1]
         return Response(
-            {'short-link': f"{base_url}/s/{short_code}"},
+            {'short-link': f"{base_url}/s/{code}"},
             status=status.HTTP_200_OK
         )
 
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[AllowAny],
-        url_path=r's/(?P<short_code>[^/.]+)'
+        permission_classes=[IsAdminUser],
+        url_path='cache_stats'
     )
-    def short_link_redirect(self, request, short_code=None):
-        match = re.match(r'^(\d+)-', short_code)
-        if not match:
-            raise ValidationError(
-                "Неверный формат короткой ссылки.",
-                code=400
-            )
-        recipe_id = match.group(1)
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        recipe_url = reverse(
-            'recipe-detail',
-            args=[recipe.id],
-            request=request
-        )
+    def cache_stats(self, request):
+        return Response(get_cache_stats())
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart_totals'
+    )
+    def shopping_cart_totals(self, request):
         return Response(
-            {'url': recipe_url},
-            status=status.HTTP_200_OK
+            ShoppingCartItemSerializer(
+                ShoppingCartItem.objects.filter(
+                    user=request.user
+                ).select_related('ingredient').order_by('ingredient__name'),
+                many=True
+            ).data
         )
 
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated],
-        url_path='download_shopping_cart'
+        url_path='download_shopping_cart',
+        content_negotiation_class=ShoppingListNegotiation
     )
     def download_shopping_cart(self, request):
+        export_format = request.query_params.get('format', 'txt')
+        if export_format not in SHOPPING_LIST_FORMATS:
+            raise ValidationError(
+                f"Неподдерживаемый формат '{export_format}'. "
+                f"Доступны: {', '.join(SHOPPING_LIST_FORMATS)}."
+            )
+        export, content_type = SHOPPING_LIST_FORMATS[export_format]
         user = request.user
-        products = ProductInRecipe.objects.filter(
-            recipe__shopping_carts__user=user,
-            amount__gte=1
-        ).exclude(
-            amount=0
-        ).select_related('ingredient').values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(
-            total_amount=Sum('amount')
+        products = ShoppingCartItem.objects.filter(user=user).values(
+            'amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
         ).order_by('ingredient__name')
         recipes = Recipe.objects.filter(
             shopping_carts__user=user
-        ).select_related('author')
-        current_date = datetime.now().strftime('%Y-%m-%d %H:%M')
-        content = (
-            f"Список покупок от {current_date} \n\n" + (
-                "Ваш список покупок пуст.\n" if not products else
-                "Продукты:\n" + "\n".join(
-                    f"{idx}. {item['ingredient__name'].capitalize()} - "
-                    f"{item['total_amount']} "
-                    f"{item['ingredient__measurement_unit']}"
-                    for idx, item in enumerate(products, 1)
-                ) + "\n\nРецепты в списке:\n" + "\n".join(
-                    f"{idx}. {recipe.name} (автор: {recipe.author.username})"
-                    for idx, recipe in enumerate(recipes, 1)
-                )
-            )
+        ).values('name', 'author__username')
+        response = StreamingHttpResponse(
+            export(
+                products.iterator(chunk_size=STREAM_CHUNK_SIZE),
+                recipes.iterator(chunk_size=STREAM_CHUNK_SIZE)
+            ),
+            content_type=content_type
         )
-        buffer = StringIO(content)
-        return FileResponse(
-            buffer,
-            as_attachment=True,
-            filename="shopping_list.txt",
-            content_type='text/plain; charset=utf-8'
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{export_format}"'
         )
+        return response
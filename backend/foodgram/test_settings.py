@@ -0,0 +1,20 @@
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+SECURE_SSL_REDIRECT = False
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PRODUCT_INDEX_CHECK_INTERVAL = 0
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-media-')
+CHUNKED_UPLOAD_DIR = tempfile.mkdtemp(prefix='foodgram-uploads-')
+
+NPLUSONE_MODE = 'raise'
@@ -1,11 +1,17 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+from api.short_links import short_link_redirect
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    re_path(
+        r'^s/(?P<short_code>[0-9A-Za-z-]+)/?$',
+        short_link_redirect,
+        name='short-link-redirect'
+    ),
 ]
 
 if settings.DEBUG:
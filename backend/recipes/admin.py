@@ -1,8 +1,22 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
 from django.utils.safestring import mark_safe
 from django.contrib.admin import SimpleListFilter
-from django.db.models import Count
+from django.core.cache import cache
+from django.db.models import (
+    Count,
+    Exists,
+    ExpressionWrapper,
+    IntegerField,
+    Max,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery
+)
+from django.db.models.functions import Coalesce
 from .models import (
     User,
     Subscription,
@@ -10,128 +24,210 @@ from .models import (
     Recipe,
     ProductInRecipe,
     Favorite,
-    ShoppingCart
+    ShoppingCart,
+    ShoppingCartItem,
+    ShortLink
 )
+from .renditions import get_rendition_url
+
+ADMIN_FILTER_CACHE_TIMEOUT = 60
+COOKING_TIME_CACHE_KEY = 'admin:filter:cooking_time'
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0
+    )
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    template = 'admin/recipes/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        self.admin_site = model_admin.admin_site
+        super().__init__(
+            field,
+            request,
+            params,
+            model,
+            model_admin,
+            field_path
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+            'display': 'Все',
+        }
+
+    def rendered_widget(self):
+        form_field = self.field.formfield(
+            widget=AutocompleteSelect(
+                self.field,
+                self.admin_site
+            ),
+            required=False
+        )
+        return form_field.widget.render(
+            self.lookup_kwarg,
+            self.lookup_val,
+            attrs={
+                'id': f'autocomplete-filter-{self.field_path}',
+                'style': 'width: 100%',
+            }
+        )
+
+
+class AutocompleteFilterMixin:
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=[
+                'admin/js/jquery.init.js',
+                'recipes/admin/autocomplete_filter.js'
+            ])
+        )
 
 
 class CookingTimeFilter(SimpleListFilter):
     title = 'Время приготовления'
     parameter_name = 'cooking_time'
 
+    def get_stats(self):
+        stats = cache.get(COOKING_TIME_CACHE_KEY)
+        if stats is not None:
+            return stats
+        max_time = Coalesce(
+            Subquery(
+                Recipe.objects.order_by('-cooking_time').values(
+                    'cooking_time'
+                )[:1]
+            ),
+            60
+        )
+        fast_threshold = ExpressionWrapper(
+            max_time / 3,
+            output_field=IntegerField()
+        )
+        medium_threshold = ExpressionWrapper(
+            max_time / 3 * 2,
+            output_field=IntegerField()
+        )
+        stats = Recipe.objects.aggregate(
+            fast_threshold=Max(fast_threshold),
+            medium_threshold=Max(medium_threshold),
+            fast=Count('pk', filter=Q(cooking_time__lte=fast_threshold)),
+            medium=Count('pk', filter=Q(
+                cooking_time__gt=fast_threshold,
+                cooking_time__lte=medium_threshold
+            )),
+            long=Count('pk', filter=Q(cooking_time__gt=medium_threshold))
+        )
+        if stats['fast_threshold'] is None:
+            stats.update(fast_threshold=60 // 3, medium_threshold=60 // 3 * 2)
+        cache.set(COOKING_TIME_CACHE_KEY, stats, ADMIN_FILTER_CACHE_TIMEOUT)
+        return stats
+
     def lookups(self, request, model_admin):
-        recipes = Recipe.objects.all()
-        if not recipes.exists():
-            return [
-                ('fast', 'Быстрые (0)'),
-                ('medium', 'Средние (0)'),
-                ('long', 'Долгие (0)')
-            ]
-        times = recipes.values_list('cooking_time', flat=True)
-        max_time = max(times, default=60)
-        fast_threshold = max_time // 3
-        medium_threshold = (max_time // 3) * 2
-        fast_count = recipes.filter(cooking_time__lte=fast_threshold).count()
-        medium_count = recipes.filter(
-            cooking_time__gt=fast_threshold,
-            cooking_time__lte=medium_threshold
-        ).count()
-        long_count = recipes.filter(cooking_time__gt=medium_threshold).count()
+        stats = self.get_stats()
         return [
-            ('fast', f'Быстрые (<= {fast_threshold} мин, {fast_count})'),
-            ('medium', f'Средние (<= {medium_threshold} мин, {medium_count})'),
-            ('long', f'Долгие (> {medium_threshold} мин, {long_count})')
+            ('fast', 'Быстрые (<= {fast_threshold} мин, {fast})'.format(
+                **stats
+            )),
+            ('medium', 'Средние (<= {medium_threshold} мин, {medium})'.format(
+                **stats
+            )),
+            ('long', 'Долгие (> {medium_threshold} мин, {long})'.format(
+                **stats
+            ))
         ]
 
     def queryset(self, request, recipes):
         if not self.value():
             return recipes
-        times = recipes.values_list('cooking_time', flat=True)
-        max_time = max(times, default=60) if times else 60
-        fast_threshold = max_time // 3
-        medium_threshold = (max_time // 3) * 2
+        stats = self.get_stats()
         if self.value() == 'fast':
-            return recipes.filter(cooking_time__lte=fast_threshold)
+            return recipes.filter(cooking_time__lte=stats['fast_threshold'])
         elif self.value() == 'medium':
             return recipes.filter(
-                cooking_time__gt=fast_threshold,
-                cooking_time__lte=medium_threshold
+                cooking_time__gt=stats['fast_threshold'],
+                cooking_time__lte=stats['medium_threshold']
             )
-        return recipes.filter(cooking_time__gt=medium_threshold)
+        return recipes.filter(cooking_time__gt=stats['medium_threshold'])
 
 
-class HasRecipesFilter(SimpleListFilter):
-    title = 'Есть рецепты'
-    parameter_name = 'has_recipes'
+class RelationExistsFilter(SimpleListFilter):
+    relation_model = None
+    relation_field = None
+
+    def get_condition(self):
+        return Exists(self.relation_model.objects.filter(
+            **{self.relation_field: OuterRef('pk')}
+        ))
+
+    def get_counts(self):
+        key = f'admin:filter:{self.parameter_name}'
+        counts = cache.get(key)
+        if counts is None:
+            counts = User.objects.aggregate(
+                yes=Count('pk', filter=self.get_condition()),
+                total=Count('pk')
+            )
+            cache.set(key, counts, ADMIN_FILTER_CACHE_TIMEOUT)
+        return counts
 
     def lookups(self, request, model_admin):
-        users = User.objects.annotate(recipe_count=Count('recipes'))
-        yes_count = users.filter(recipe_count__gt=0).count()
-        no_count = users.filter(recipe_count=0).count()
+        counts = self.get_counts()
         return (
-            ('yes', f'Да ({yes_count})'),
-            ('no', f'Нет ({no_count})')
+            ('yes', f"Да ({counts['yes']})"),
+            ('no', f"Нет ({counts['total'] - counts['yes']})")
         )
 
     def queryset(self, request, users):
         if self.value() == 'yes':
-            return users.annotate(
-                recipe_count=Count('recipes')
-            ).filter(recipe_count__gt=0)
+            return users.filter(self.get_condition())
         if self.value() == 'no':
-            return users.annotate(
-                recipe_count=Count('recipes')
-            ).filter(recipe_count=0)
+            return users.filter(~self.get_condition())
         return users
 
 
-class HasSubscriptionsFilter(SimpleListFilter):
-    title = 'Есть подписки'
-    parameter_name = 'has_subscriptions'
+class HasRecipesFilter(RelationExistsFilter):
+    title = 'Есть рецепты'
+    parameter_name = 'has_recipes'
+    relation_model = Recipe
+    relation_field = 'author'
 
-    def lookups(self, request, model_admin):
-        users = User.objects.annotate(sub_count=Count('subscriptions'))
-        yes_count = users.filter(sub_count__gt=0).count()
-        no_count = users.filter(sub_count=0).count()
-        return (
-            ('yes', f'Да ({yes_count})'),
-            ('no', f'Нет ({no_count})')
-        )
 
-    def queryset(self, request, users):
-        if self.value() == 'yes':
-            return users.annotate(
-                sub_count=Count('subscriptions')
-            ).filter(sub_count__gt=0)
-        if self.value() == 'no':
-            return users.annotate(
-                sub_count=Count('subscriptions')
-            ).filter(sub_count=0)
-        return users
+class HasSubscriptionsFilter(RelationExistsFilter):
+    title = 'Есть подписки'
+    parameter_name = 'has_subscriptions'
+    relation_model = Subscription
+    relation_field = 'user'
 
 
-class HasSubscribersFilter(SimpleListFilter):
+class HasSubscribersFilter(RelationExistsFilter):
     title = 'Есть подписчики'
     parameter_name = 'has_subscribers'
-
-    def lookups(self, request, model_admin):
-        users = User.objects.annotate(auth_count=Count('authors'))
-        yes_count = users.filter(auth_count__gt=0).count()
-        no_count = users.filter(auth_count=0).count()
-        return (
-            ('yes', f'Да ({yes_count})'),
-            ('no', f'Нет ({no_count})')
-        )
-
-    def queryset(self, request, users):
-        if self.value() == 'yes':
-            return users.annotate(
-                auth_count=Count('authors')
-            ).filter(auth_count__gt=0)
-        if self.value() == 'no':
-            return users.annotate(
-                auth_count=Count('authors')
-            ).filter(auth_count=0)
-        return users
+    relation_model = Subscription
+    relation_field = 'author'
 
 
 @admin.register(User)
@@ -196,26 +292,33 @@ class UserAdmin(UserAdmin):
     def get_avatar(self, user):
         if user.avatar:
             return (
-                f'<img src="{user.avatar.url}" width="50" '
+                f'<img src="{get_rendition_url(user.avatar, 320)}" width="50" '
                 f'height="50" style="object-fit: cover;" />'
             )
         return 'Нет аватара'
 
-    @admin.display(description='Рецепты')
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=count_subquery(Recipe, 'author'),
+            subscriptions_count=count_subquery(Subscription, 'user'),
+            subscribers_count=count_subquery(Subscription, 'author')
+        )
+
+    @admin.display(description='Рецепты', ordering='recipes_count')
     def recipes_count(self, user):
-        return user.recipes.count()
+        return user.recipes_count
 
-    @admin.display(description='Подписки')
+    @admin.display(description='Подписки', ordering='subscriptions_count')
     def subscriptions_count(self, user):
-        return user.subscriptions.count()
+        return user.subscriptions_count
 
-    @admin.display(description='Подписчики')
+    @admin.display(description='Подписчики', ordering='subscribers_count')
     def subscribers_count(self, user):
-        return user.authors.count()
+        return user.subscribers_count
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('user', 'author')
     search_fields = (
         'user__username',
@@ -223,7 +326,12 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'author__username',
         'author__email'
     )
-    list_filter = ('user', 'author')
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('author', AutocompleteFilter)
+    )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
 
 
 @admin.register(Product)
@@ -233,19 +341,24 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('measurement_unit',)
     ordering = ('name',)
 
-    @admin.display(description='Рецепты')
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=count_subquery(ProductInRecipe, 'ingredient')
+        )
+
+    @admin.display(description='Рецепты', ordering='recipes_count')
     def recipes_count(self, product):
-        return product.productinrecipe_set.count()
+        return product.recipes_count
 
-    @admin.display(description='Есть в рецептах')
+    @admin.display(description='Есть в рецептах', ordering='recipes_count')
     def in_recipes(self, product):
-        return product.productinrecipe_set.exists()
+        return product.recipes_count > 0
 
     in_recipes.boolean = True
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = (
         'id',
         'name',
@@ -261,13 +374,35 @@ class RecipeAdmin(admin.ModelAdmin):
         'author__email',
         'text'
     )
-    list_filter = ('author', CookingTimeFilter)
+    list_filter = (('author', AutocompleteFilter), CookingTimeFilter)
+    autocomplete_fields = ('author',)
     readonly_fields = ('favorites_count',)
     ordering = ('-created_at',)
+    list_select_related = ('author',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=count_subquery(Favorite, 'recipe')
+        ).prefetch_related(
+            Prefetch(
+                'products',
+                ProductInRecipe.objects.select_related('ingredient')
+            )
+        )
 
-    @admin.display(description='В избранном')
+    def get_search_results(self, request, recipes, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return recipes, False
+        return recipes.filter(
+            Q(id__in=Recipe.objects.search(search_term).values('id'))
+            | Q(author__username__icontains=search_term)
+            | Q(author__email__icontains=search_term)
+        ), False
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def favorites_count(self, recipe):
-        return recipe.favorites.count()
+        return recipe.favorites_count
 
     @admin.display(description='Продукты')
     @mark_safe
@@ -284,18 +419,23 @@ class RecipeAdmin(admin.ModelAdmin):
     def get_image(self, recipe):
         if recipe.image:
             return (
-                f'<img src="{recipe.image.url}" width="100" '
-                f'height="100" style="object-fit: cover;" />'
+                f'<img src="{get_rendition_url(recipe.image, 320)}" '
+                f'width="100" height="100" style="object-fit: cover;" />'
             )
         return 'Нет картинки'
 
 
 @admin.register(ProductInRecipe)
-class ProductInRecipeAdmin(admin.ModelAdmin):
+class ProductInRecipeAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('recipe', 'get_product_name', 'amount')
     search_fields = ('recipe__name', 'ingredient__name')
-    list_filter = ('recipe', 'ingredient')
+    list_filter = (
+        ('recipe', AutocompleteFilter),
+        ('ingredient', AutocompleteFilter)
+    )
     ordering = ('recipe',)
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
 
     @admin.display(description='Продукт')
     def get_product_name(self, product_in_recipe):
@@ -303,24 +443,63 @@ class ProductInRecipeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('user', 'recipe')
     search_fields = (
         'user__username',
         'user__email',
         'recipe__name'
     )
-    list_filter = ('user', 'recipe')
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('recipe', AutocompleteFilter)
+    )
     ordering = ('user',)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('user', 'recipe')
     search_fields = (
         'user__username',
         'user__email',
         'recipe__name'
     )
-    list_filter = ('user', 'recipe')
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('recipe', AutocompleteFilter)
+    )
     ordering = ('user',)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+
+
+@admin.register(ShoppingCartItem)
+class ShoppingCartItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'amount')
+    search_fields = (
+        'user__username',
+        'user__email',
+        'ingredient__name'
+    )
+    list_select_related = ('user', 'ingredient')
+    ordering = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ShortLink)
+class ShortLinkAdmin(admin.ModelAdmin):
+    list_display = ('code', 'recipe')
+    search_fields = ('code', 'recipe__name')
+    list_select_related = ('recipe',)
+    raw_id_fields = ('recipe',)
@@ -1,7 +1,27 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, post_save
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты, пользователи и связанные модели'
+
+    def ready(self):
+        from .renditions import (
+            create_avatar_renditions,
+            create_recipe_renditions
+        )
+        from .search import create_search_indexes
+        from .triggers import create_shopping_cart_triggers
+
+        post_migrate.connect(create_search_indexes, sender=self)
+        post_migrate.connect(create_shopping_cart_triggers, sender=self)
+        post_save.connect(
+            create_recipe_renditions,
+            sender=self.get_model('Recipe')
+        )
+        post_save.connect(
+            create_avatar_renditions,
+            sender=self.get_model('User')
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import ShoppingCartItem
+
+
+class Command(BaseCommand):
+    help = 'Check aggregated shopping cart items against shopping carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Check only the given user id (repeatable)'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild items for users with inconsistencies'
+        )
+
+    def handle(self, *args, **options):
+        inconsistencies = ShoppingCartItem.objects.find_inconsistencies(
+            options['user_ids']
+        )
+        if not inconsistencies:
+            self.stdout.write(
+                self.style.SUCCESS("Shopping cart items are consistent")
+            )
+            return
+        for user_id, product_id, expected, actual in inconsistencies:
+            self.stdout.write(
+                f"user={user_id} product={product_id} "
+                f"expected={expected} actual={actual}"
+            )
+        if options['fix']:
+            ShoppingCartItem.objects.rebuild(
+                user_ids={user_id for user_id, *_ in inconsistencies}
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Fixed {len(inconsistencies)} inconsistencies"
+                )
+            )
+            return
+        raise CommandError(
+            f"Found {len(inconsistencies)} inconsistent shopping cart items"
+        )
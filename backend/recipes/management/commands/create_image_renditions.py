@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe, User
+from recipes.renditions import create_renditions
+
+
+class Command(BaseCommand):
+    help = 'Create missing thumbnails and WebP renditions for media images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Recreate renditions that already exist'
+        )
+
+    def handle(self, *args, **options):
+        created = 0
+        sources = (
+            (Recipe.objects.exclude(image=''), 'image'),
+            (User.objects.exclude(avatar='').exclude(avatar=None), 'avatar'),
+        )
+        for queryset, field_name in sources:
+            for instance in queryset.only('pk', field_name).iterator():
+                created += len(create_renditions(
+                    getattr(instance, field_name),
+                    overwrite=options['overwrite']
+                ))
+        self.stdout.write(
+            self.style.SUCCESS(f"Successfully created {created} renditions")
+        )
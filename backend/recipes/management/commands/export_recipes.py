@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from recipes.snapshot import dump_record, iter_records, write_media_archive
+
+
+class Command(BaseCommand):
+    help = 'Export users, products, recipes and their relations as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Output file, standard output by default'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--with-passwords',
+            action='store_true',
+            help='Include password hashes of exported users'
+        )
+        parser.add_argument(
+            '--media-archive',
+            help='Also write referenced media files into this tar archive'
+        )
+
+    def handle(self, *args, **options):
+        output = (
+            sys.stdout if options['path'] == '-'
+            else open(options['path'], 'w', encoding='utf-8')
+        )
+        exported = 0
+        try:
+            for record in iter_records(
+                options['chunk_size'],
+                options['with_passwords']
+            ):
+                output.write(dump_record(record) + '\n')
+                exported += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(
+            self.style.SUCCESS(f"Successfully exported {exported} records")
+        )
+        if options['media_archive']:
+            written = write_media_archive(options['media_archive'])
+            self.stderr.write(
+                self.style.SUCCESS(f"Successfully archived {written} files")
+            )
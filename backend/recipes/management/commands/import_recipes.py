@@ -0,0 +1,61 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.cache import bump_generation
+from api.product_index import product_index
+from recipes.snapshot import SnapshotImporter, read_media_archive
+
+
+class Command(BaseCommand):
+    help = 'Import an NDJSON snapshot written by export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Input file, standard input by default'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--media-archive',
+            help='Restore media files from this tar archive first'
+        )
+
+    def handle(self, *args, **options):
+        media_names = None
+        if options['media_archive']:
+            media_names = read_media_archive(options['media_archive'])
+            self.stdout.write(f"Restored {len(media_names)} media files")
+        importer = SnapshotImporter(options['batch_size'], media_names)
+        source = (
+            sys.stdin if options['path'] == '-'
+            else open(options['path'], 'r', encoding='utf-8')
+        )
+        try:
+            with transaction.atomic():
+                for line_number, line in enumerate(source, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        importer.add(json.loads(line))
+                    except (ValueError, KeyError) as error:
+                        raise CommandError(f"Line {line_number}: {error}")
+                    if line_number % 10000 == 0:
+                        self.stdout.write(f"Processed {line_number} lines")
+                counts = importer.finish()
+                transaction.on_commit(bump_generation)
+                transaction.on_commit(product_index.invalidate)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(self.style.SUCCESS(
+            'Successfully imported: ' + ', '.join(
+                f'{count} {name}' for name, count in sorted(counts.items())
+            )
+        ))
+        self.stdout.write(
+            "Run create_image_renditions to build renditions for new images"
+        )
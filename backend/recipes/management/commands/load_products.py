@@ -1,44 +1,178 @@
+import csv
 import json
 import os
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from recipes.models import Product
+from api.cache import bump_generation
+from api.product_index import product_index
+
+READ_SIZE = 64 * 1024
+NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = Product._meta.get_field('measurement_unit').max_length
+
+
+def iter_json_items(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        buffer = buffer.lstrip()
+        if buffer and not started:
+            if not buffer.startswith('['):
+                raise CommandError('Invalid JSON: expected an array')
+            buffer = buffer[1:]
+            started = True
+            continue
+        if started and buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if started and buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError('Invalid JSON: unexpected end of file')
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_csv_items(file):
+    for row in csv.reader(file):
+        if len(row) < 2 or row[:2] == ['name', 'measurement_unit']:
+            continue
+        yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+READERS = {
+    'json': iter_json_items,
+    'csv': iter_csv_items,
+}
+
+
+def is_valid(item):
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get('name'), str)
+        and isinstance(item.get('measurement_unit'), str)
+        and 0 < len(item['name']) <= NAME_MAX_LENGTH
+        and 0 < len(item['measurement_unit']) <= UNIT_MAX_LENGTH
+    )
 
 
 class Command(BaseCommand):
-    help = 'Load products data from JSON file into the Product model'
+    help = 'Load products data from a JSON or CSV file into the Product model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(
+                settings.BASE_DIR,
+                'data',
+                'ingredients.json'
+            )
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='File format, detected from the extension by default'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--update-units',
+            action='store_true',
+            help='Change the unit of a product that exists with another one'
+        )
 
     def handle(self, *args, **options):
-        file_path = os.path.join(
-            settings.BASE_DIR,
-            'data',
-            'ingredients.json'
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1][1:].lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(f"Unsupported file format '{file_format}'")
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive')
+
+        self.counts = dict.fromkeys(
+            ('inserted', 'updated', 'skipped', 'invalid'),
+            0
         )
+        processed = 0
+        batch = []
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for item in READERS[file_format](f):
+                processed += 1
+                if not is_valid(item):
+                    self.counts['invalid'] += 1
+                    continue
+                batch.append((item['name'], item['measurement_unit']))
+                if len(batch) >= options['batch_size']:
+                    self.load_batch(batch, options['update_units'])
+                    batch = []
+                    self.stdout.write(f"Processed {processed} products")
+            if batch:
+                self.load_batch(batch, options['update_units'])
+
+        if self.counts['inserted'] or self.counts['updated']:
+            product_index.invalidate()
+            transaction.on_commit(bump_generation)
+        summary = (
+            "Inserted {inserted}, updated {updated}, "
+            "skipped {skipped}, invalid {invalid} products"
+        ).format(**self.counts)
+        if processed == self.counts['invalid']:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def load_batch(self, batch, update_units):
+        units = {}
+        for name, measurement_unit in batch:
+            units.setdefault(name, set()).add(measurement_unit)
+        self.counts['skipped'] += len(batch) - sum(map(len, units.values()))
+        existing = {}
+        for product in Product.objects.filter(name__in=units).only(
+            'id',
+            'name',
+            'measurement_unit'
+        ):
+            existing.setdefault(product.name, []).append(product)
 
-        products = [
-            Product(
-                name=item['name'],
-                measurement_unit=item['measurement_unit']
+        new_products = []
+        changed_products = []
+        for name, name_units in units.items():
+            products = existing.get(name, [])
+            known_units = {product.measurement_unit for product in products}
+            missing_units = name_units - known_units
+            self.counts['skipped'] += len(name_units & known_units)
+            if (update_units and len(products) == 1
+                    and len(name_units) == 1 and missing_units):
+                products[0].measurement_unit = missing_units.pop()
+                products[0].updated_at = timezone.now()
+                changed_products.append(products[0])
+            new_products.extend(
+                Product(name=name, measurement_unit=measurement_unit)
+                for measurement_unit in missing_units
             )
-            for item in data
-            if isinstance(item, dict)
-            and 'name' in item
-            and 'measurement_unit' in item
-        ]
-
-        if products:
-            Product.objects.bulk_create(products, ignore_conflicts=True)
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"Successfully loaded {len(products)} new products"
-                )
+
+        if changed_products:
+            Product.objects.bulk_update(
+                changed_products,
+                ['measurement_unit', 'updated_at']
             )
-        else:
-            self.stdout.write(
-                self.style.WARNING(
-                    "No valid products found in the JSON file"
-                )
+            self.counts['updated'] += len(changed_products)
+        if new_products:
+            Product.objects.bulk_create(
+                new_products,
+                update_conflicts=True,
+                unique_fields=['name', 'measurement_unit'],
+                update_fields=['updated_at']
             )
+            self.counts['inserted'] += len(new_products)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from recipes.models import ShoppingCartItem
+
+
+class Command(BaseCommand):
+    help = 'Rebuild aggregated shopping cart items from shopping carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Rebuild only for the given user id (repeatable)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ShoppingCartItem.objects.rebuild(
+            user_ids=options['user_ids'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Successfully rebuilt shopping cart items"
+            )
+        )
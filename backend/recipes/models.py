@@ -1,6 +1,18 @@
+import string
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.core.validators import RegexValidator, MinValueValidator
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity
+)
+from django.db import connections
+from .search import SEARCH_CONFIG, recipe_search_vector
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
 
 
 class User(AbstractUser):
@@ -37,6 +49,10 @@ class User(AbstractUser):
         null=True,
         verbose_name="Аватар",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name']
@@ -50,6 +66,60 @@ class User(AbstractUser):
         return self.username
 
 
+class UserRelationManager(models.Manager):
+    def __init__(self, target='recipe'):
+        super().__init__()
+        self.target = target
+
+    def get_sql_parts(self):
+        quote = connections[self.db].ops.quote_name
+        opts = self.model._meta
+        target = opts.get_field(self.target)
+        return (
+            quote(opts.db_table),
+            quote(opts.get_field('user').column),
+            quote(target.column),
+            quote(target.related_model._meta.db_table),
+            quote(target.target_field.column)
+        )
+
+    def execute(self, sql, params):
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return {row[0] for row in cursor.fetchall()}
+
+    def add(self, user_id, target_ids):
+        target_ids = list(target_ids)
+        if not target_ids:
+            return set()
+        table, user_column, target_column, target_table, target_pk = (
+            self.get_sql_parts()
+        )
+        placeholders = ', '.join(['%s'] * len(target_ids))
+        return self.execute(
+            f'INSERT INTO {table} ({user_column}, {target_column}) '
+            f'SELECT %s, {target_pk} FROM {target_table} '
+            f'WHERE {target_pk} IN ({placeholders}) AND NOT EXISTS ('
+            f'SELECT 1 FROM {table} WHERE {user_column} = %s '
+            f'AND {target_column} = {target_table}.{target_pk}) '
+            f'ON CONFLICT DO NOTHING RETURNING {target_column}',
+            [user_id, *target_ids, user_id]
+        )
+
+    def remove(self, user_id, target_ids):
+        target_ids = list(target_ids)
+        if not target_ids:
+            return set()
+        table, user_column, target_column, _, _ = self.get_sql_parts()
+        placeholders = ', '.join(['%s'] * len(target_ids))
+        return self.execute(
+            f'DELETE FROM {table} WHERE {user_column} = %s '
+            f'AND {target_column} IN ({placeholders}) '
+            f'RETURNING {target_column}',
+            [user_id, *target_ids]
+        )
+
+
 class Subscription(models.Model):
     user = models.ForeignKey(
         'User',
@@ -64,6 +134,8 @@ class Subscription(models.Model):
         verbose_name="Автор",
     )
 
+    objects = UserRelationManager('author')
+
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
@@ -91,6 +163,10 @@ class Product(models.Model):
         max_length=64,
         verbose_name="Единица измерения",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -108,6 +184,34 @@ class Product(models.Model):
         return f"{self.name} ({self.measurement_unit})"
 
 
+class RecipeQuerySet(models.QuerySet):
+    def search(self, value):
+        if connections[self.db].vendor != 'postgresql':
+            return self.filter(
+                models.Q(name__icontains=value)
+                | models.Q(text__icontains=value)
+            ).annotate(
+                rank=models.Case(
+                    models.When(name__icontains=value, then=1.0),
+                    default=0.5,
+                    output_field=models.FloatField()
+                )
+            ).order_by('-rank', '-created_at', '-id')
+        query = SearchQuery(
+            value,
+            config=SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        return self.alias(
+            search=recipe_search_vector()
+        ).annotate(
+            rank=SearchRank(recipe_search_vector(), query)
+            + TrigramSimilarity('name', value)
+        ).filter(
+            models.Q(search=query) | models.Q(name__trigram_similar=value)
+        ).order_by('-rank', '-created_at', '-id')
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         'User',
@@ -134,11 +238,23 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name="Дата создания",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="recipe_created_at_id_idx"
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -175,6 +291,20 @@ class ProductInRecipe(models.Model):
     def __str__(self):
         return f"{self.ingredient} в {self.recipe}"
 
+    def touch_recipe(self):
+        Recipe.objects.filter(pk=self.recipe_id).update(
+            updated_at=timezone.now()
+        )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.touch_recipe()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.touch_recipe()
+        return result
+
 
 class UserRecipeRelation(models.Model):
     user = models.ForeignKey(
@@ -188,6 +318,8 @@ class UserRecipeRelation(models.Model):
         verbose_name="Рецепт",
     )
 
+    objects = UserRelationManager()
+
     class Meta:
         abstract = True
         constraints = [
@@ -215,7 +347,7 @@ class Favorite(UserRecipeRelation):
         related_name="favorites"
     )
 
-    class Meta:
+    class Meta(UserRecipeRelation.Meta):
         verbose_name = "Избранное"
         verbose_name_plural = "Избранное"
 
@@ -234,6 +366,137 @@ class ShoppingCart(UserRecipeRelation):
         related_name="shopping_carts"
     )
 
-    class Meta:
+    class Meta(UserRecipeRelation.Meta):
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
+
+
+class ShortLinkManager(models.Manager):
+    def get_code(self, recipe):
+        link, _ = self.get_or_create(
+            recipe=recipe,
+            defaults={'code': self.model.encode(recipe.id)}
+        )
+        return link.code
+
+
+class ShortLink(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        related_name="short_link"
+    )
+    code = models.CharField(
+        max_length=16,
+        unique=True,
+        verbose_name="Код",
+    )
+
+    objects = ShortLinkManager()
+
+    class Meta:
+        verbose_name = "Короткая ссылка"
+        verbose_name_plural = "Короткие ссылки"
+
+    def __str__(self):
+        return f"{self.code} -> {self.recipe}"
+
+    @staticmethod
+    def encode(number):
+        code = ''
+        while True:
+            number, remainder = divmod(number, len(BASE62_ALPHABET))
+            code = BASE62_ALPHABET[remainder] + code
+            if not number:
+                return code
+
+
+class ShoppingCartItemManager(models.Manager):
+    def expected_amounts(self, user_ids=None):
+        carts = ShoppingCart.objects.all()
+        if user_ids is not None:
+            carts = carts.filter(user_id__in=user_ids)
+        return {
+            (row['user_id'], row['recipe__products__ingredient_id']):
+                row['total']
+            for row in carts.values(
+                'user_id',
+                'recipe__products__ingredient_id'
+            ).annotate(
+                total=models.Sum('recipe__products__amount')
+            ).order_by()
+            if row['total']
+        }
+
+    def rebuild(self, user_ids=None, batch_size=1000):
+        with transaction.atomic():
+            items = self.all()
+            if user_ids is not None:
+                items = items.filter(user_id__in=user_ids)
+            items.delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        user_id=user_id,
+                        ingredient_id=product_id,
+                        amount=amount
+                    )
+                    for (user_id, product_id), amount
+                    in self.expected_amounts(user_ids).items()
+                ],
+                batch_size=batch_size
+            )
+
+    def find_inconsistencies(self, user_ids=None):
+        expected = self.expected_amounts(user_ids)
+        items = self.all()
+        if user_ids is not None:
+            items = items.filter(user_id__in=user_ids)
+        actual = {
+            (user_id, product_id): amount
+            for user_id, product_id, amount in items.values_list(
+                'user_id',
+                'ingredient_id',
+                'amount'
+            )
+        }
+        return [
+            (*key, expected.get(key), actual.get(key))
+            for key in sorted(expected.keys() | actual.keys())
+            if expected.get(key) != actual.get(key)
+        ]
+
+
+class ShoppingCartItem(models.Model):
+    user = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="shopping_cart_items"
+    )
+    ingredient = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+        related_name="shopping_cart_items"
+    )
+    amount = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)],
+        verbose_name="Количество",
+    )
+
+    objects = ShoppingCartItemManager()
+
+    class Meta:
+        verbose_name = "Продукт в списке покупок"
+        verbose_name_plural = "Продукты в списках покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_cart_item",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient} у {self.user}: {self.amount}"
@@ -0,0 +1,70 @@
+import logging
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = (320, 640)
+RENDITION_QUALITY = 80
+
+
+def get_rendition_name(name, size):
+    path = PurePosixPath(name)
+    return str(
+        PurePosixPath('renditions') / path.parent / f'{path.stem}_{size}.webp'
+    )
+
+
+def get_rendition_url(image, size):
+    if not image:
+        return ''
+    return image.storage.url(get_rendition_name(image.name, size))
+
+
+def create_renditions(image, overwrite=False):
+    if not image:
+        return []
+    storage = image.storage
+    sizes = [
+        size for size in RENDITION_SIZES
+        if overwrite or not storage.exists(
+            get_rendition_name(image.name, size)
+        )
+    ]
+    if not sizes:
+        return []
+    try:
+        with image.open('rb') as file:
+            source = ImageOps.exif_transpose(Image.open(file))
+            source.load()
+    except (OSError, Image.DecompressionBombError) as error:
+        logger.warning('Cannot create renditions for %s: %s', image, error)
+        return []
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert(
+            'RGBA' if 'transparency' in source.info else 'RGB'
+        )
+    for size in sizes:
+        rendition = source.copy()
+        rendition.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        rendition.save(buffer, 'WEBP', quality=RENDITION_QUALITY)
+        name = get_rendition_name(image.name, size)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+    return sizes
+
+
+def renditions_receiver(field_name):
+    def receiver(sender, instance, update_fields=None, **kwargs):
+        if update_fields is None or field_name in update_fields:
+            create_renditions(getattr(instance, field_name))
+    return receiver
+
+
+create_recipe_renditions = renditions_receiver('image')
+create_avatar_renditions = renditions_receiver('avatar')
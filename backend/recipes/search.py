@@ -0,0 +1,39 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import connections
+
+SEARCH_CONFIG = 'russian'
+
+
+def recipe_search_vector():
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def recipe_search_indexes():
+    return [
+        GinIndex(recipe_search_vector(), name='recipe_search_vector_idx'),
+        GinIndex(
+            OpClass('name', name='gin_trgm_ops'),
+            name='recipe_name_trgm_idx'
+        ),
+    ]
+
+
+def create_search_indexes(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    recipe_model = sender.get_model('Recipe')
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(
+            cursor,
+            recipe_model._meta.db_table
+        )
+    with connection.schema_editor() as schema_editor:
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index in recipe_search_indexes():
+            if index.name not in existing:
+                schema_editor.add_index(recipe_model, index)
@@ -0,0 +1,306 @@
+import json
+import tarfile
+from collections import Counter
+from datetime import datetime
+from pathlib import PurePosixPath
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    Favorite,
+    Product,
+    ProductInRecipe,
+    Recipe,
+    ShoppingCart,
+    ShoppingCartItem,
+    Subscription,
+    User
+)
+
+SNAPSHOT_VERSION = 1
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'avatar')
+SOURCES = (
+    ('product', Product, ('id', 'name', 'measurement_unit')),
+    ('recipe', Recipe, (
+        'id',
+        'author_id',
+        'name',
+        'image',
+        'text',
+        'cooking_time',
+        'created_at'
+    )),
+    ('ingredient', ProductInRecipe, ('recipe_id', 'ingredient_id', 'amount')),
+    ('favorite', Favorite, ('user_id', 'recipe_id')),
+    ('shopping_cart', ShoppingCart, ('user_id', 'recipe_id')),
+    ('subscription', Subscription, ('user_id', 'author_id')),
+)
+
+
+def iter_records(chunk_size=2000, with_passwords=False):
+    yield {'type': 'snapshot', 'version': SNAPSHOT_VERSION}
+    user_fields = USER_FIELDS + (('password',) if with_passwords else ())
+    sources = (('user', User, user_fields),) + SOURCES
+    for record_type, model, fields in sources:
+        for row in model.objects.order_by('pk').values(*fields).iterator(
+            chunk_size
+        ):
+            yield {'type': record_type, **row}
+
+
+def dump_record(record):
+    return json.dumps(record, ensure_ascii=False, default=datetime.isoformat)
+
+
+def iter_media_names():
+    yield from Recipe.objects.exclude(image='').values_list(
+        'image',
+        flat=True
+    ).iterator()
+    yield from User.objects.exclude(avatar='').exclude(
+        avatar=None
+    ).values_list('avatar', flat=True).iterator()
+
+
+def write_media_archive(path):
+    written = 0
+    with tarfile.open(path, 'w:gz' if path.endswith('gz') else 'w') as tar:
+        for name in iter_media_names():
+            if not default_storage.exists(name):
+                continue
+            info = tarfile.TarInfo(name)
+            info.size = default_storage.size(name)
+            with default_storage.open(name, 'rb') as file:
+                tar.addfile(info, file)
+            written += 1
+    return written
+
+
+def read_media_archive(path):
+    names = {}
+    with tarfile.open(path, 'r:*') as tar:
+        for member in tar:
+            parts = PurePosixPath(member.name).parts
+            if not member.isfile() or member.name.startswith('/') or (
+                '..' in parts
+            ):
+                continue
+            if default_storage.exists(member.name):
+                names[member.name] = member.name
+                continue
+            names[member.name] = default_storage.save(
+                member.name,
+                File(tar.extractfile(member), name=member.name)
+            )
+    return names
+
+
+class SnapshotImporter:
+    def __init__(self, batch_size=1000, media_names=None):
+        self.batch_size = batch_size
+        self.media_names = media_names or {}
+        self.users = {}
+        self.products = {}
+        self.recipes = {}
+        self.cart_users = set()
+        self.counts = Counter()
+        self.pending_type = None
+        self.pending = []
+
+    def add(self, record):
+        record_type = record.get('type')
+        if record_type == 'snapshot':
+            if record.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"Unsupported snapshot version {record.get('version')}"
+                )
+            return
+        if not hasattr(self, f'load_{record_type}'):
+            raise ValueError(f"Unknown record type '{record_type}'")
+        if record_type != self.pending_type:
+            self.flush()
+            self.pending_type = record_type
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            getattr(self, f'load_{self.pending_type}')(self.pending)
+            self.pending = []
+
+    def finish(self):
+        self.flush()
+        if self.cart_users:
+            ShoppingCartItem.objects.rebuild(user_ids=self.cart_users)
+        return self.counts
+
+    def get_media_name(self, name):
+        if not name:
+            return name
+        return self.media_names.get(name, name)
+
+    def load_user(self, records):
+        existing = User.objects.filter(
+            Q(username__in=[record['username'] for record in records])
+            | Q(email__in=[record['email'] for record in records])
+        ).values_list('id', 'username', 'email')
+        existing = list(existing)
+        by_username = {username: pk for pk, username, _ in existing}
+        by_email = {email: pk for pk, _, email in existing}
+        new_users = []
+        new_records = []
+        for record in records:
+            pk = by_username.get(record['username']) or by_email.get(
+                record['email']
+            )
+            if pk is not None:
+                self.users[record['id']] = pk
+                self.counts['users skipped'] += 1
+                continue
+            new_records.append(record)
+            new_users.append(User(
+                username=record['username'],
+                email=record['email'],
+                first_name=record['first_name'],
+                last_name=record['last_name'],
+                avatar=self.get_media_name(record['avatar']),
+                password=record.get('password') or make_password(None)
+            ))
+        User.objects.bulk_create(new_users)
+        for record, user in zip(new_records, new_users):
+            self.users[record['id']] = user.pk
+        self.counts['users created'] += len(new_users)
+
+    def load_product(self, records):
+        existing = {
+            (name, measurement_unit): pk
+            for pk, name, measurement_unit in Product.objects.filter(
+                name__in=[record['name'] for record in records]
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        new_products = {}
+        for record in records:
+            key = (record['name'], record['measurement_unit'])
+            if key in existing:
+                self.products[record['id']] = existing[key]
+                self.counts['products skipped'] += 1
+            else:
+                new_products.setdefault(key, []).append(record['id'])
+        products = Product.objects.bulk_create([
+            Product(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in new_products
+        ])
+        for product, old_ids in zip(products, new_products.values()):
+            for old_id in old_ids:
+                self.products[old_id] = product.pk
+        self.counts['products created'] += len(products)
+
+    def load_recipe(self, records):
+        records = [
+            record for record in records
+            if record['author_id'] in self.users
+        ]
+        for record in records:
+            record['created_at'] = parse_datetime(record['created_at'])
+        existing = {
+            (author_id, name, created_at): pk
+            for pk, author_id, name, created_at in Recipe.objects.filter(
+                author_id__in={
+                    self.users[record['author_id']] for record in records
+                },
+                name__in={record['name'] for record in records}
+            ).values_list('id', 'author_id', 'name', 'created_at')
+        }
+        new_records = []
+        for record in records:
+            pk = existing.get((
+                self.users[record['author_id']],
+                record['name'],
+                record['created_at']
+            ))
+            if pk is not None:
+                self.recipes[record['id']] = pk
+                self.counts['recipes skipped'] += 1
+            else:
+                new_records.append(record)
+        records = new_records
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author_id=self.users[record['author_id']],
+                name=record['name'],
+                image=self.get_media_name(record['image']),
+                text=record['text'],
+                cooking_time=record['cooking_time']
+            )
+            for record in records
+        ])
+        for record, recipe in zip(records, recipes):
+            self.recipes[record['id']] = recipe.pk
+            recipe.created_at = record['created_at']
+        Recipe.objects.bulk_update(recipes, ['created_at'])
+        self.counts['recipes created'] += len(recipes)
+
+    def load_relations(self, model, records, fields, maps):
+        objects = [
+            model(**{
+                field: id_map[record[field]]
+                for field, id_map in zip(fields, maps)
+            }, **{
+                key: value for key, value in record.items()
+                if key not in fields and key != 'type'
+            })
+            for record in records
+            if all(record[field] in id_map for field, id_map in zip(
+                fields,
+                maps
+            ))
+        ]
+        total = model.objects.count()
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        created = model.objects.count() - total
+        name = model._meta.model_name
+        self.counts[f'{name} rows created'] += created
+        self.counts[f'{name} rows skipped'] += len(objects) - created
+        return objects
+
+    def load_ingredient(self, records):
+        self.load_relations(
+            ProductInRecipe,
+            records,
+            ('recipe_id', 'ingredient_id'),
+            (self.recipes, self.products)
+        )
+
+    def load_favorite(self, records):
+        self.load_relations(
+            Favorite,
+            records,
+            ('user_id', 'recipe_id'),
+            (self.users, self.recipes)
+        )
+
+    def load_shopping_cart(self, records):
+        carts = self.load_relations(
+            ShoppingCart,
+            records,
+            ('user_id', 'recipe_id'),
+            (self.users, self.recipes)
+        )
+        self.cart_users.update(cart.user_id for cart in carts)
+
+    def load_subscription(self, records):
+        self.load_relations(
+            Subscription,
+            [
+                record for record in records
+                if self.users.get(record['user_id'])
+                != self.users.get(record['author_id'])
+            ],
+            ('user_id', 'author_id'),
+            (self.users, self.users)
+        )
@@ -0,0 +1,98 @@
+from django.db import connections
+
+CART_FUNCTION = 'recipes_shoppingcart_sync_items'
+INGREDIENT_FUNCTION = 'recipes_productinrecipe_sync_items'
+
+
+def get_tables(app_config, connection):
+    return {
+        name: connection.ops.quote_name(
+            app_config.get_model(model_name)._meta.db_table
+        )
+        for name, model_name in (
+            ('carts', 'ShoppingCart'),
+            ('lines', 'ProductInRecipe'),
+            ('items', 'ShoppingCartItem'),
+        )
+    }
+
+
+def get_upsert_sql(items, select):
+    return (
+        f'INSERT INTO {items} (user_id, ingredient_id, amount) {select} '
+        'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+        f'SET amount = {items}.amount + EXCLUDED.amount;'
+    )
+
+
+def get_trigger_sql(carts, lines, items):
+    add_recipe = get_upsert_sql(
+        items,
+        f'SELECT NEW.user_id, ingredient_id, amount FROM {lines} '
+        'WHERE recipe_id = NEW.recipe_id ORDER BY ingredient_id'
+    )
+    add_line = get_upsert_sql(
+        items,
+        f'SELECT user_id, NEW.ingredient_id, NEW.amount FROM {carts} '
+        'WHERE recipe_id = NEW.recipe_id ORDER BY user_id'
+    )
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {CART_FUNCTION}() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE {items}
+                SET amount = GREATEST({items}.amount - line.amount, 0)
+                FROM {lines} AS line
+                WHERE line.recipe_id = OLD.recipe_id
+                    AND {items}.user_id = OLD.user_id
+                    AND {items}.ingredient_id = line.ingredient_id;
+                DELETE FROM {items}
+                WHERE user_id = OLD.user_id AND amount = 0;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                {add_recipe}
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION {INGREDIENT_FUNCTION}() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE {items}
+                SET amount = GREATEST({items}.amount - OLD.amount, 0)
+                FROM {carts} AS cart
+                WHERE cart.recipe_id = OLD.recipe_id
+                    AND {items}.user_id = cart.user_id
+                    AND {items}.ingredient_id = OLD.ingredient_id;
+                DELETE FROM {items}
+                WHERE ingredient_id = OLD.ingredient_id AND amount = 0;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                {add_line}
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+        """,
+        f'CREATE OR REPLACE TRIGGER {CART_FUNCTION} '
+        f'AFTER INSERT OR UPDATE OF user_id, recipe_id OR DELETE ON {carts} '
+        f'FOR EACH ROW EXECUTE FUNCTION {CART_FUNCTION}()',
+        f'CREATE OR REPLACE TRIGGER {INGREDIENT_FUNCTION} '
+        'AFTER INSERT OR UPDATE OF recipe_id, ingredient_id, amount '
+        f'OR DELETE ON {lines} '
+        f'FOR EACH ROW EXECUTE FUNCTION {INGREDIENT_FUNCTION}()',
+    ]
+
+
+def create_shopping_cart_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.schema_editor() as schema_editor:
+        for sql in get_trigger_sql(**get_tables(sender, connection)):
+            schema_editor.execute(sql)
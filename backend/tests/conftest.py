@@ -0,0 +1,94 @@
+import base64
+
+import pytest
+from django.core.files.base import ContentFile
+from rest_framework.test import APIClient
+
+from recipes.models import Product, ProductInRecipe, Recipe, User
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4nGP4z8DwHwAFAAH/'
+    'iZk9HQAAAABJRU5ErkJggg=='
+)
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username='user',
+        email='user@example.com',
+        password='password',
+        first_name='Имя',
+        last_name='Фамилия'
+    )
+
+
+@pytest.fixture
+def authors():
+    return [
+        User.objects.create_user(
+            username=f'author{number}',
+            email=f'author{number}@example.com',
+            password='password',
+            first_name='Автор',
+            last_name=str(number)
+        )
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def products():
+    return Product.objects.bulk_create(
+        Product(name=f'Продукт {number}', measurement_unit='г')
+        for number in range(30)
+    )
+
+
+@pytest.fixture
+def make_recipes(authors, products):
+    def make_recipes(count, ingredients=3):
+        recipes = []
+        for number in range(count):
+            recipe = Recipe(
+                author=authors[number % len(authors)],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=number % 60 + 1
+            )
+            recipe.image.save('recipe.png', ContentFile(PNG), save=False)
+            recipe.save()
+            recipes.append(recipe)
+        ProductInRecipe.objects.bulk_create(
+            ProductInRecipe(
+                recipe=recipe,
+                ingredient=products[(index + number) % len(products)],
+                amount=number + 1
+            )
+            for index, recipe in enumerate(recipes)
+            for number in range(ingredients)
+        )
+        return recipes
+    return make_recipes
+
+
+@pytest.fixture
+def png():
+    return PNG
+
+
+@pytest.fixture
+def image():
+    return 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
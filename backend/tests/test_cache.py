@@ -0,0 +1,26 @@
+import pytest
+
+from api.cache import get_generation
+from recipes.models import User
+
+
+@pytest.mark.django_db
+def test_recipes_cache_survives_signups_and_private_user_changes(
+    django_capture_on_commit_callbacks
+):
+    generation = get_generation()
+    with django_capture_on_commit_callbacks(execute=True):
+        user = User.objects.create_user(
+            username='newcomer',
+            email='newcomer@example.com',
+            password='password'
+        )
+    assert get_generation() == generation
+    with django_capture_on_commit_callbacks(execute=True):
+        user.set_password('another-password')
+        user.save(update_fields=['password'])
+    assert get_generation() == generation
+    with django_capture_on_commit_callbacks(execute=True):
+        user.first_name = 'Новое имя'
+        user.save(update_fields=['first_name'])
+    assert get_generation() != generation
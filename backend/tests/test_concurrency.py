@@ -0,0 +1,147 @@
+import threading
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from recipes.models import (
+    Favorite,
+    Product,
+    ProductInRecipe,
+    Recipe,
+    ShoppingCart,
+    ShoppingCartItem,
+    Subscription,
+    User
+)
+
+THREADS = 8
+
+
+def run_concurrently(function, arguments):
+    barrier = threading.Barrier(len(arguments))
+    results = [None] * len(arguments)
+    errors = []
+
+    def run(index, argument):
+        try:
+            barrier.wait()
+            with transaction.atomic():
+                results[index] = function(argument)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=run, args=(index, argument))
+        for index, argument in enumerate(arguments)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class ShoppingCartItemConcurrencyTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='user',
+            email='user@example.com',
+            password='password'
+        )
+        products = Product.objects.bulk_create(
+            Product(name=f'Продукт {number}', measurement_unit='г')
+            for number in range(5)
+        )
+        self.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=self.user,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10
+            )
+            for number in range(THREADS)
+        )
+        ProductInRecipe.objects.bulk_create(
+            ProductInRecipe(recipe=recipe, ingredient=product, amount=10)
+            for recipe in self.recipes
+            for product in products
+        )
+
+    def test_parallel_cart_adds_sharing_products(self):
+        results, errors = run_concurrently(
+            lambda recipe: ShoppingCart.objects.add(
+                self.user.id,
+                [recipe.id]
+            ),
+            self.recipes
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [{recipe.id} for recipe in self.recipes])
+        self.assertEqual(ShoppingCartItem.objects.find_inconsistencies(), [])
+        self.assertEqual(
+            set(ShoppingCartItem.objects.values_list('amount', flat=True)),
+            {10 * THREADS}
+        )
+
+
+class UserRelationConcurrencyTest(TransactionTestCase):
+    def setUp(self):
+        self.user, self.author = User.objects.bulk_create(
+            User(username=username, email=f'{username}@example.com')
+            for username in ('user', 'author')
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10
+        )
+
+    def assert_one_winner(self, results, errors, winner):
+        self.assertEqual(errors, [])
+        self.assertEqual([result for result in results if result], [winner])
+
+    def test_parallel_adds_and_removes_of_one_recipe(self):
+        for model in (Favorite, ShoppingCart):
+            with self.subTest(model=model.__name__):
+                recipe_ids = {self.recipe.id}
+                results, errors = run_concurrently(
+                    lambda _: model.objects.add(self.user.id, recipe_ids),
+                    range(THREADS)
+                )
+                self.assert_one_winner(results, errors, recipe_ids)
+                self.assertEqual(
+                    model.objects.filter(user=self.user).count(),
+                    1
+                )
+                results, errors = run_concurrently(
+                    lambda _: model.objects.remove(self.user.id, recipe_ids),
+                    range(THREADS)
+                )
+                self.assert_one_winner(results, errors, recipe_ids)
+                self.assertFalse(model.objects.filter(user=self.user).exists())
+
+    def test_parallel_subscriptions_to_one_author(self):
+        results, errors = run_concurrently(
+            lambda _: Subscription.objects.add(self.user.id, [self.author.id]),
+            range(THREADS)
+        )
+        self.assert_one_winner(results, errors, {self.author.id})
+        self.assertEqual(
+            Subscription.objects.filter(
+                user=self.user,
+                author=self.author
+            ).count(),
+            1
+        )
+        results, errors = run_concurrently(
+            lambda _: Subscription.objects.remove(
+                self.user.id,
+                [self.author.id]
+            ),
+            range(THREADS)
+        )
+        self.assert_one_winner(results, errors, {self.author.id})
+        self.assertFalse(Subscription.objects.exists())
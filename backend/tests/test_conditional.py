@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+RECIPES_URL = '/api/recipes/'
+
+
+def get(client, url, **headers):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, **headers)
+    return response, context.captured_queries
+
+
+@pytest.mark.django_db
+def test_me_returns_current_user(user, user_client):
+    response = user_client.get('/api/users/me/')
+    assert response.status_code == 200
+    assert response.data['username'] == user.username
+
+
+@pytest.mark.django_db
+def test_anonymous_cache_hit_does_not_touch_the_database(
+    client, make_recipes
+):
+    make_recipes(5)
+    response, _ = get(client, RECIPES_URL)
+    assert response['X-Cache'] == 'MISS'
+    etag = response['ETag']
+    response, queries = get(client, RECIPES_URL)
+    assert response.status_code == 200
+    assert response['X-Cache'] == 'HIT'
+    assert response['ETag'] == etag
+    assert queries == []
+    response, queries = get(client, RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert queries == []
+
+
+@pytest.mark.django_db
+def test_recipe_list_version_is_cheap_and_per_page(
+    user_client, make_recipes
+):
+    make_recipes(10)
+    response, queries = get(user_client, f'{RECIPES_URL}?cursor=&limit=3')
+    assert response.status_code == 200
+    assert not any(
+        'COUNT(' in query['sql'] and '"recipes_recipe"' in query['sql']
+        for query in queries
+    )
+    first = user_client.get(f'{RECIPES_URL}?page=1&limit=3')
+    second = user_client.get(f'{RECIPES_URL}?page=2&limit=3')
+    assert first['ETag'] != second['ETag']
+
+
+@pytest.mark.django_db
+def test_recipe_list_etag_changes_with_recipes(
+    client, make_recipes, django_capture_on_commit_callbacks
+):
+    recipe, = make_recipes(1)
+    etag = client.get(RECIPES_URL)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.name = 'Новое название'
+        recipe.save()
+    response = client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
@@ -0,0 +1,18 @@
+import pytest
+from django.core.management import call_command
+
+from api.cache import get_generation
+from recipes.models import Product
+
+
+@pytest.mark.django_db
+def test_load_products_updates_units_and_bumps_recipes_cache(
+    tmp_path, products, django_capture_on_commit_callbacks
+):
+    path = tmp_path / 'products.csv'
+    path.write_text(f'{products[0].name},кг\n', encoding='utf-8')
+    generation = get_generation()
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('load_products', str(path), '--update-units')
+    assert Product.objects.get(pk=products[0].pk).measurement_unit == 'кг'
+    assert get_generation() != generation
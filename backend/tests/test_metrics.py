@@ -0,0 +1,21 @@
+import re
+
+import pytest
+
+from api.metrics import registry
+
+SERIALIZE_TIMING = re.compile(r'serialize;dur=(\d+\.\d)')
+
+
+@pytest.mark.django_db
+def test_recipe_list_reports_serialization_time(user_client, make_recipes):
+    make_recipes(20, ingredients=5)
+    response = user_client.get('/api/recipes/?limit=20')
+    assert response.status_code == 200
+    timing = SERIALIZE_TIMING.search(response['Server-Timing'])
+    assert timing is not None
+    assert float(timing.group(1)) > 0
+    assert (
+        'foodgram_request_serialize_duration_seconds_count'
+        '{view="recipes-list"}'
+    ) in registry.render()
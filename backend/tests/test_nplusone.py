@@ -0,0 +1,34 @@
+import pytest
+from django.test import RequestFactory
+
+from api.nplusone import NPlusOneError, NPlusOneMiddleware, detect_n_plus_one
+from recipes.models import Recipe
+
+
+def load_authors_one_by_one(request=None):
+    for recipe in Recipe.objects.all():
+        recipe.author.username
+
+
+@pytest.mark.django_db
+def test_middleware_raises_on_seeded_n_plus_one(make_recipes):
+    make_recipes(10, ingredients=0)
+    middleware = NPlusOneMiddleware(load_authors_one_by_one)
+    with pytest.raises(NPlusOneError, match='recipes_user'):
+        middleware(RequestFactory().get('/api/recipes/'))
+
+
+@pytest.mark.django_db
+def test_detector_raises_on_seeded_n_plus_one(make_recipes):
+    make_recipes(10, ingredients=0)
+    with pytest.raises(NPlusOneError):
+        with detect_n_plus_one():
+            load_authors_one_by_one()
+
+
+@pytest.mark.django_db
+def test_detector_accepts_joined_queries(make_recipes):
+    make_recipes(10, ingredients=0)
+    with detect_n_plus_one():
+        for recipe in Recipe.objects.select_related('author'):
+            recipe.author.username
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+RECIPES_URL = '/api/recipes/'
+
+
+@pytest.mark.django_db
+def test_recipe_cursor_pages_through_rows_within_one_millisecond(
+    client, make_recipes
+):
+    recipes = make_recipes(7, ingredients=0)
+    created_at = timezone.now().replace(microsecond=123000)
+    for number, recipe in enumerate(recipes):
+        recipe.created_at = created_at + timedelta(microseconds=number * 100)
+    Recipe.objects.bulk_update(recipes, ['created_at'])
+    url = f'{RECIPES_URL}?limit=2&cursor='
+    seen = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(recipe['id'] for recipe in response.data['results'])
+        url = response.data['next']
+    assert seen == [recipe.pk for recipe in reversed(recipes)]
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_returns_not_found(client):
+    response = client.get(f'{RECIPES_URL}?cursor=not-a-cursor')
+    assert response.status_code == 404
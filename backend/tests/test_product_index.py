@@ -0,0 +1,34 @@
+import pytest
+from django.utils import timezone
+
+from api.product_index import product_index
+from recipes.models import Product
+
+PRODUCTS_URL = '/api/ingredients/'
+
+
+def bulk_rename(products, name):
+    for product in products:
+        product.name = name
+        product.updated_at = timezone.now()
+    Product.objects.bulk_update(products, ['name', 'updated_at'])
+
+
+@pytest.mark.django_db
+def test_index_sees_changes_made_without_signals(client, products):
+    assert client.get(f'{PRODUCTS_URL}?name=Морковь').data == []
+    bulk_rename(products[:1], 'Морковь')
+    response = client.get(f'{PRODUCTS_URL}?name=Морковь')
+    assert [product['id'] for product in response.data] == [products[0].pk]
+
+
+@pytest.mark.django_db
+def test_index_rechecks_the_database_at_most_once_per_interval(
+    settings, products, django_assert_num_queries
+):
+    settings.PRODUCT_INDEX_CHECK_INTERVAL = 60
+    product_index.invalidate()
+    product_index.search('Продукт')
+    with django_assert_num_queries(0):
+        product_index.search('Продукт')
+    product_index.invalidate()
@@ -0,0 +1,92 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, ProductInRecipe, ShoppingCart
+
+RECIPES_URL = '/api/recipes/'
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_recipes_list_query_count_does_not_depend_on_page_size(
+    user, user_client, make_recipes
+):
+    recipes = make_recipes(100)
+    Favorite.objects.bulk_create(
+        Favorite(user=user, recipe=recipe) for recipe in recipes[::2]
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipe) for recipe in recipes[::3]
+    )
+    assert count_queries(user_client, f'{RECIPES_URL}?limit=3') == (
+        count_queries(user_client, f'{RECIPES_URL}?limit=100')
+    )
+
+
+@pytest.mark.django_db
+def test_anonymous_recipes_list_query_count_does_not_depend_on_page_size(
+    client, make_recipes
+):
+    make_recipes(100)
+    assert count_queries(client, f'{RECIPES_URL}?limit=3') == (
+        count_queries(client, f'{RECIPES_URL}?limit=100')
+    )
+
+
+def add_ingredients(recipes, products, count):
+    ProductInRecipe.objects.bulk_create(
+        (
+            ProductInRecipe(recipe=recipe, ingredient=product, amount=10)
+            for recipe in recipes
+            for product in products[:count]
+        ),
+        ignore_conflicts=True
+    )
+
+
+@pytest.mark.django_db
+def test_recipe_reads_query_count_does_not_depend_on_ingredients(
+    user_client, make_recipes, products
+):
+    recipes = make_recipes(25, ingredients=1)
+    detail_url = f'{RECIPES_URL}{recipes[0].pk}/'
+    list_queries = count_queries(user_client, f'{RECIPES_URL}?limit=25')
+    detail_queries = count_queries(user_client, detail_url)
+    add_ingredients(recipes, products, 20)
+    assert count_queries(user_client, f'{RECIPES_URL}?limit=25') == (
+        list_queries
+    )
+    assert count_queries(user_client, detail_url) == detail_queries
+
+
+def create_recipe(client, products, image, count):
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(RECIPES_URL, {
+            'name': f'Рецепт из {count} продуктов',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': image,
+            'ingredients': [
+                {'id': product.pk, 'amount': 10}
+                for product in products[:count]
+            ],
+        }, format='json')
+    assert response.status_code == 201, response.data
+    assert len(response.data['ingredients']) == count
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_recipe_create_query_count_does_not_depend_on_ingredients(
+    user_client, products, image
+):
+    assert create_recipe(user_client, products, image, 2) == (
+        create_recipe(user_client, products, image, 20)
+    )
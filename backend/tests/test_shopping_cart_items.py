@@ -0,0 +1,147 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    ProductInRecipe,
+    ShoppingCart,
+    ShoppingCartItem,
+    User
+)
+
+RECIPES_URL = '/api/recipes/'
+
+
+def get_items(user):
+    return dict(
+        ShoppingCartItem.objects.filter(user=user).values_list(
+            'ingredient_id',
+            'amount'
+        )
+    )
+
+
+def assert_consistent():
+    assert ShoppingCartItem.objects.find_inconsistencies() == []
+
+
+@pytest.fixture
+def recipes(make_recipes):
+    return make_recipes(4, ingredients=3)
+
+
+@pytest.mark.django_db
+def test_items_follow_cart_toggles(user, user_client, recipes):
+    for recipe in recipes[:2]:
+        response = user_client.post(f'{RECIPES_URL}{recipe.pk}/shopping_cart/')
+        assert response.status_code == 201
+    assert get_items(user)
+    assert_consistent()
+    response = user_client.delete(
+        f'{RECIPES_URL}{recipes[0].pk}/shopping_cart/'
+    )
+    assert response.status_code == 204
+    assert_consistent()
+    response = user_client.delete(
+        f'{RECIPES_URL}{recipes[1].pk}/shopping_cart/'
+    )
+    assert response.status_code == 204
+    assert get_items(user) == {}
+
+
+@pytest.mark.django_db
+def test_items_follow_bulk_add_and_clear(user, user_client, recipes):
+    response = user_client.post(
+        f'{RECIPES_URL}shopping_cart/bulk/',
+        {'ids': [recipe.pk for recipe in recipes]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert_consistent()
+    response = user_client.delete(
+        f'{RECIPES_URL}shopping_cart/bulk/',
+        {'ids': [recipes[0].pk]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert_consistent()
+    response = user_client.delete(f'{RECIPES_URL}shopping_cart/clear/')
+    assert response.status_code == 204
+    assert get_items(user) == {}
+
+
+@pytest.mark.django_db
+def test_items_follow_recipe_update(user, authors, recipes, products, image):
+    recipe = recipes[0]
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=authors[1], recipe=recipe)
+    author_client = APIClient()
+    author_client.force_authenticate(recipe.author)
+    line = recipe.products.first()
+    response = author_client.patch(
+        f'{RECIPES_URL}{recipe.pk}/',
+        {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'image': image,
+            'ingredients': [
+                {'id': line.ingredient_id, 'amount': line.amount + 5},
+                {'id': products[-1].pk, 'amount': 7},
+            ]
+        },
+        format='json'
+    )
+    assert response.status_code == 200, response.data
+    assert get_items(user) == {
+        line.ingredient_id: line.amount + 5,
+        products[-1].pk: 7,
+    }
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_items_follow_model_edits_and_cascades(user, recipes):
+    for recipe in recipes[:3]:
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+    line = ProductInRecipe.objects.filter(recipe=recipes[0]).first()
+    line.amount += 10
+    line.save()
+    assert_consistent()
+    cart = ShoppingCart.objects.get(user=user, recipe=recipes[0])
+    cart.recipe = recipes[3]
+    cart.save()
+    assert_consistent()
+    line.delete()
+    ProductInRecipe.objects.filter(recipe=recipes[3]).first().delete()
+    assert_consistent()
+    recipes[1].delete()
+    assert_consistent()
+    recipes[2].products.first().ingredient.delete()
+    assert_consistent()
+    User.objects.filter(pk=recipes[2].author_id).delete()
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_shopping_cart_item_admin_is_read_only(user, recipes):
+    admin = User.objects.create_superuser(
+        username='admin',
+        email='admin@example.com',
+        password='password'
+    )
+    ShoppingCart.objects.create(user=user, recipe=recipes[0])
+    item = ShoppingCartItem.objects.filter(user=user).first()
+    client = APIClient()
+    client.force_login(admin)
+    url = '/admin/recipes/shoppingcartitem/'
+    assert client.get(url).status_code == 200
+    assert client.get(f'{url}add/').status_code == 403
+    assert client.post(
+        f'{url}{item.pk}/change/',
+        {'user': user.pk, 'ingredient': item.ingredient_id, 'amount': 1}
+    ).status_code == 403
+    assert client.post(
+        f'{url}{item.pk}/delete/',
+        {'post': 'yes'}
+    ).status_code == 403
+    assert ShoppingCartItem.objects.get(pk=item.pk).amount == item.amount
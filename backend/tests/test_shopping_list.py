@@ -0,0 +1,27 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from api import shopping_list
+from recipes.models import ShoppingCart
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.mark.django_db
+def test_pdf_shopping_list_embeds_the_configured_font(
+    user, user_client, make_recipes
+):
+    recipe, = make_recipes(1)
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    response = user_client.get(f'{DOWNLOAD_URL}?format=pdf')
+    assert response.status_code == 200
+    content = b''.join(response.streaming_content)
+    assert content.startswith(b'%PDF')
+    assert b'DejaVuSans' in content
+
+
+def test_missing_pdf_font_is_an_error(settings, monkeypatch):
+    monkeypatch.setattr(shopping_list, 'PDF_FONT_NAME', 'MissingFont')
+    settings.SHOPPING_LIST_PDF_FONT = '/nonexistent/font.ttf'
+    with pytest.raises(ImproperlyConfigured):
+        shopping_list.export_pdf(iter(()), iter(()))
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from recipes.models import Favorite, ProductInRecipe, Recipe
+from recipes.snapshot import SnapshotImporter, dump_record, iter_records
+
+
+def import_snapshot(records):
+    importer = SnapshotImporter(batch_size=4)
+    for record in records:
+        importer.add(json.loads(dump_record(record)))
+    return importer.finish()
+
+
+@pytest.mark.django_db
+def test_reimport_skips_existing_recipes_and_counts_real_rows(
+    user, make_recipes
+):
+    recipes = make_recipes(5)
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    records = list(iter_records())
+    ingredients = ProductInRecipe.objects.count()
+
+    counts = import_snapshot(records)
+
+    assert Recipe.objects.count() == 5
+    assert ProductInRecipe.objects.count() == ingredients
+    assert counts['recipes skipped'] == 5
+    assert counts['recipes created'] == 0
+    assert counts['productinrecipe rows created'] == 0
+    assert counts['productinrecipe rows skipped'] == ingredients
+    assert counts['favorite rows created'] == 0
+    assert counts['favorite rows skipped'] == 1
+
+
+@pytest.mark.django_db
+def test_import_creates_missing_recipes(make_recipes):
+    make_recipes(3)
+    records = list(iter_records())
+    Recipe.objects.filter(name='Рецепт 1').delete()
+
+    counts = import_snapshot(records)
+
+    assert Recipe.objects.count() == 3
+    assert counts['recipes created'] == 1
+    assert counts['recipes skipped'] == 2
+    assert counts['productinrecipe rows created'] == 3
@@ -0,0 +1,89 @@
+import pytest
+
+from api import uploads
+from api.uploads import get_upload_dir
+
+UPLOADS_URL = '/api/uploads/'
+
+
+def upload(client, content):
+    response = client.post(UPLOADS_URL)
+    assert response.status_code == 201
+    upload_id = response.data['id']
+    response = client.generic(
+        'PATCH',
+        f'{UPLOADS_URL}{upload_id}/',
+        content,
+        content_type='application/offset+octet-stream',
+        HTTP_UPLOAD_OFFSET='0'
+    )
+    assert response.status_code == 200, response.data
+    assert response.data['offset'] == len(content)
+    return response.data['token']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_avatar_from_chunked_upload_removes_the_upload(
+    user, user_client, png
+):
+    token = upload(user_client, png)
+    response = user_client.put(
+        '/api/users/me/avatar/',
+        {'avatar': token},
+        format='json'
+    )
+    assert response.status_code == 200, response.data
+    user.refresh_from_db()
+    assert user.avatar
+    assert not list(get_upload_dir(user).glob('*.part'))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recipe_from_chunked_upload_removes_the_upload(
+    user, user_client, products, png
+):
+    token = upload(user_client, png)
+    response = user_client.post('/api/recipes/', {
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': token,
+        'ingredients': [{'id': products[0].pk, 'amount': 10}],
+    }, format='json')
+    assert response.status_code == 201, response.data
+    assert not list(get_upload_dir(user).glob('*.part'))
+
+
+@pytest.mark.django_db
+def test_invalid_recipe_keeps_the_upload(user, user_client, png):
+    token = upload(user_client, png)
+    response = user_client.post('/api/recipes/', {
+        'name': 'Рецепт',
+        'image': token,
+    }, format='json')
+    assert response.status_code == 400
+    assert len(list(get_upload_dir(user).glob('*.part'))) == 1
+
+
+@pytest.mark.django_db
+def test_rejected_upload_closes_the_file(
+    user, user_client, png, settings, monkeypatch
+):
+    opened = []
+    original = uploads.open_upload
+
+    def open_upload(*args):
+        opened.append(original(*args))
+        return opened[-1]
+
+    monkeypatch.setattr(uploads, 'open_upload', open_upload)
+    token = upload(user_client, png)
+    settings.MAX_IMAGE_PIXELS = 0
+    response = user_client.put(
+        '/api/users/me/avatar/',
+        {'avatar': token},
+        format='json'
+    )
+    assert response.status_code == 400
+    assert len(opened) == 1
+    assert opened[0].closed